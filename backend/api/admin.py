@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from api.models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+
+    list_display = ['pk', 'user', 'key', 'status_code', 'expires']
+    list_select_related = ['user']
+    search_fields = ['key']
+    show_full_result_count = False
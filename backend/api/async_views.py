@@ -0,0 +1,59 @@
+"""Асинхронные обёртки для ASGI-режима.
+
+В Django 3.2 синхронные представления под ASGI выполняются по очереди в
+одном потоке. Частые запросы на чтение вместо этого уходят в отдельный
+пул потоков, каждый со своим соединением с базой, и не ждут друг друга.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = ThreadPoolExecutor(max_workers=settings.ASYNC_DB_THREADS,
+                               thread_name_prefix='async-db')
+
+
+def database_sync_to_async(func):
+    """Выполняет func в пуле потоков работы с базой.
+
+    Соединения закрываются по тем же правилам, что и в конце обычного
+    запроса, поэтому потоки пула не держат устаревших соединений.
+    """
+    @wraps(func)
+    def inner(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(inner, thread_sensitive=False, executor=_executor)
+
+
+def async_view(view):
+    """Асинхронный вариант DRF-представления.
+
+    Ответ рендерится в том же потоке пула, чтобы поля, требующие
+    запросов к базе, не возвращались в основной поток. Исходное
+    синхронное представление доступно как ``sync_view``: его вызывают
+    внутри процесса, например подзапросы /api/batch/.
+    """
+    @database_sync_to_async
+    def call(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    async def wrapper(request, *args, **kwargs):
+        return await call(request, *args, **kwargs)
+
+    # Атрибуты DRF (cls, actions, initkwargs) и csrf_exempt переносятся
+    # вручную: csrf_exempt из django.views не подходит корутинам.
+    wrapper.__dict__.update(view.__dict__)
+    wrapper.__name__ = wrapper.__qualname__ = view.__name__
+    wrapper.csrf_exempt = True
+    wrapper.sync_view = view
+    return wrapper
@@ -0,0 +1,184 @@
+"""Ограничения на работу с базой данных для отдельных представлений.
+
+Декоратор ``query_budget`` задаёт для метода viewset'а предельное время
+одного SQL-запроса, число запросов и число прочитанных строк. Время
+ограничивает сама база: на Postgres запрос выполняется в транзакции с
+``SET LOCAL statement_timeout``, на SQLite его прерывает обработчик
+прогресса. Превышение времени возвращает 503, превышение числа запросов
+или строк - 422. Каждый случай пишется в лог вместе с SQL и
+подсчитывается в кеше (``manage.py query_budget_report``).
+"""
+import logging
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+logger = logging.getLogger(__name__)
+
+BUDGETS = {}
+VIOLATIONS_KEY = 'query_budget:{}:{}'
+VIOLATION_KINDS = ('timeout', 'queries', 'rows')
+QUERY_CANCELED = '57014'
+SQLITE_PROGRESS_STEPS = 1000
+
+
+class QueryTimeout(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Запрос выполнялся слишком долго, повторите позже.'
+    default_code = 'query_timeout'
+
+
+class QueryBudgetExceeded(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'Слишком широкий запрос, уточните фильтры.'
+    default_code = 'query_budget_exceeded'
+
+
+def record_violation(name, kind, sql):
+    logger.warning('%s: превышен лимит %s, SQL: %s', name, kind, sql)
+    key = VIOLATIONS_KEY.format(name, kind)
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Ключ успели вытеснить между add и incr.
+        cache.set(key, 1, None)
+
+
+def violation_counts():
+    """Число нарушений по представлениям: {имя: {вид: число}}."""
+    return {
+        name: {
+            kind: cache.get(VIOLATIONS_KEY.format(name, kind), 0)
+            for kind in VIOLATION_KINDS
+        }
+        for name in sorted(BUDGETS)
+    }
+
+
+class BudgetScope:
+    """Следит за запросами одного вызова представления."""
+
+    def __init__(self, name, statement_timeout, max_queries, max_rows):
+        self.name = name
+        self.statement_timeout = statement_timeout
+        self.max_queries = max_queries
+        self.max_rows = max_rows
+        self.queries = 0
+        self.rows = 0
+        self.deadline = None
+        self.prepared = set()
+        self.stack = ExitStack()
+
+    def __enter__(self):
+        for alias in connections:
+            self.stack.enter_context(
+                connections[alias].execute_wrapper(self.execute))
+        return self
+
+    def __exit__(self, *exc_info):
+        return self.stack.__exit__(*exc_info)
+
+    def execute(self, execute, sql, params, many, context):
+        connection = context['connection']
+        self.queries += 1
+        if self.max_queries is not None and self.queries > self.max_queries:
+            self.violate('queries', sql, QueryBudgetExceeded)
+        if self.statement_timeout is not None:
+            self.limit_time(connection, context['cursor'])
+        if self.max_rows is not None or connection.vendor == 'sqlite':
+            self.wrap_fetch(context['cursor'], connection, sql)
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            self.check_timeout(connection, error, sql)
+            raise
+
+    def limit_time(self, connection, cursor):
+        self.deadline = time.monotonic() + self.statement_timeout / 1000
+        if connection.alias in self.prepared:
+            return
+        self.prepared.add(connection.alias)
+        if connection.vendor == 'postgresql':
+            # SET LOCAL действует только внутри транзакции, поэтому
+            # запросы представления к этой базе идут в одной транзакции.
+            if not connection.in_atomic_block:
+                self.stack.enter_context(
+                    transaction.atomic(using=connection.alias))
+            cursor.cursor.execute(
+                'SET LOCAL statement_timeout = %s',
+                [int(self.statement_timeout)]
+            )
+        elif connection.vendor == 'sqlite':
+            connection.connection.set_progress_handler(
+                self.is_overdue, SQLITE_PROGRESS_STEPS)
+            self.stack.callback(
+                connection.connection.set_progress_handler, None, 0)
+
+    def is_overdue(self):
+        return time.monotonic() > self.deadline
+
+    def wrap_fetch(self, cursor, connection, sql):
+        """Считает строки, которые Django забирает из курсора.
+
+        SQLite выполняет запрос по мере чтения, поэтому прерывание
+        по времени может случиться и здесь.
+        """
+        if 'fetchone' in vars(cursor):
+            return
+        for method in ('fetchone', 'fetchmany', 'fetchall'):
+            fetch = getattr(cursor, method)
+
+            def counted(*args, fetch=fetch):
+                try:
+                    rows = fetch(*args)
+                except OperationalError as error:
+                    self.check_timeout(connection, error, sql)
+                    raise
+                self.add_rows(len(rows) if isinstance(rows, list)
+                              else int(rows is not None), sql)
+                return rows
+
+            setattr(cursor, method, counted)
+
+    def add_rows(self, count, sql):
+        self.rows += count
+        if self.max_rows is not None and self.rows > self.max_rows:
+            self.violate('rows', sql, QueryBudgetExceeded)
+
+    def check_timeout(self, connection, error, sql):
+        if connection.vendor == 'postgresql':
+            timed_out = getattr(
+                error.__cause__, 'pgcode', None) == QUERY_CANCELED
+        else:
+            timed_out = 'interrupted' in str(error)
+        if timed_out and self.statement_timeout is not None:
+            self.violate('timeout', sql, QueryTimeout)
+
+    def violate(self, kind, sql, exception):
+        record_violation(self.name, kind, sql)
+        raise exception
+
+
+def query_budget(statement_timeout=None, max_queries=None, max_rows=None):
+    """Декоратор метода viewset'а с лимитами на работу с базой.
+
+    statement_timeout - миллисекунды на один SQL-запрос, max_queries -
+    число запросов, max_rows - число строк, прочитанных из базы за вызов.
+    """
+    def decorator(view):
+        name = view.__qualname__
+        BUDGETS[name] = (statement_timeout, max_queries, max_rows)
+
+        @wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            with BudgetScope(name, statement_timeout, max_queries, max_rows):
+                return view(self, request, *args, **kwargs)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,73 @@
+import binascii
+import uuid
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from drf_base64.fields import Base64ImageField
+from PIL import UnidentifiedImageError
+from rest_framework import serializers
+
+from recipes.images import ImageTooLarge, clean_image
+
+BASE64_MARKER = ';base64,'
+# Кратно 4, чтобы каждый кусок декодировался независимо.
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class RecipeImageField(Base64ImageField):
+    """Base64-картинка с ограничением размера и очисткой EXIF.
+
+    Строка декодируется кусками во временный файл, поэтому в памяти
+    не появляется ещё одна полная копия изображения.
+    """
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_size} Мб.',
+        'too_many_pixels': 'Слишком большое разрешение изображения.',
+        'bad_base64': 'Некорректная строка base64.',
+    }
+
+    def _decode(self, data):
+        if not (isinstance(data, str) and data.startswith('data:')):
+            return super()._decode(data)
+        start = data.find(BASE64_MARKER)
+        if start == -1:
+            self.fail('bad_base64')
+        start += len(BASE64_MARKER)
+        max_size = settings.RECIPE_IMAGE_MAX_BYTES
+        if (len(data) - start) // 4 * 3 > max_size:
+            self.fail('too_large', max_size=round(max_size / 1024 ** 2, 1))
+        with SpooledTemporaryFile(max_size=DECODE_CHUNK_SIZE * 16) as file:
+            try:
+                for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+                    file.write(binascii.a2b_base64(
+                        data[offset:offset + DECODE_CHUNK_SIZE]
+                    ))
+                file.seek(0)
+                content, extension = clean_image(file)
+            except binascii.Error:
+                self.fail('bad_base64')
+            except ImageTooLarge:
+                self.fail('too_many_pixels')
+            except (UnidentifiedImageError, OSError):
+                self.fail('invalid_image')
+        return ContentFile(content, name=f'{uuid.uuid4()}.{extension}')
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии фотографии рецепта."""
+
+    def to_representation(self, value):
+        if not value:
+            return {}
+        request = self.context.get('request')
+        urls = {}
+        for variant, formats in value.get('files', {}).items():
+            urls[variant] = {}
+            for extension, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                urls[variant][extension] = url
+        return urls
@@ -1,4 +1,5 @@
 from distutils.util import strtobool
+from django import forms
 from django_filters import FilterSet, filters
 from django_filters import rest_framework
 
@@ -9,6 +10,22 @@ CHOICES_LIST = (
     ('0', 'False'),
     ('1', 'True')
 )
+TAGS_MATCH_CHOICES = (
+    ('any', 'Любой из тегов'),
+    ('all', 'Все теги')
+)
+
+
+class SlugListField(forms.Field):
+    """Список слагов из повторяющегося параметра запроса."""
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [slug for slug in value or () if slug]
+
+
+class SlugListFilter(filters.Filter):
+    field_class = SlugListField
 
 
 class IngredientFilter(FilterSet):
@@ -32,12 +49,27 @@ class RecipeFilter(rest_framework.FilterSet):
         field_name='author',
         lookup_expr='exact'
     )
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
+    tags = SlugListFilter(method='tags_method')
+    tags_match = rest_framework.ChoiceFilter(
+        choices=TAGS_MATCH_CHOICES,
+        method='tags_match_method'
     )
 
+    def tags_method(self, queryset, name, value):
+        if not value:
+            return queryset
+        slugs = set(value)
+        ids_by_slug = Tag.objects.ids_by_slug()
+        tag_ids = {ids_by_slug[slug] for slug in slugs if slug in ids_by_slug}
+        match_all = self.form.cleaned_data.get('tags_match') == 'all'
+        if not tag_ids or (match_all and len(tag_ids) < len(slugs)):
+            return queryset.none()
+        return queryset.with_tags(tag_ids, match_all=match_all)
+
+    def tags_match_method(self, queryset, name, value):
+        """Режим применяется в tags_method."""
+        return queryset
+
     def is_favorited_method(self, queryset, name, value):
         if self.request.user.is_anonymous:
             return Recipe.objects.none()
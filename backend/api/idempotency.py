@@ -0,0 +1,92 @@
+"""Повтор запросов с заголовком Idempotency-Key.
+
+Ключ сохраняется в той же транзакции, что и изменения самого запроса,
+вместе с его ответом. Повтор с тем же ключом получает сохранённый ответ
+без повторного выполнения. Параллельный дубликат упирается в
+уникальный индекс незафиксированной строки и ждёт, пока первый запрос
+завершится: после фиксации он отдаст её ответ, после отката выполнится
+сам.
+
+Декоратор удаляет истёкшие ключи только того пользователя, который
+прислал запрос; ключи остальных удаляет ``manage.py
+purge_idempotency_keys``.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from recipes.purge import PURGE_BATCH_SIZE, delete_rows
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(
+        f'{request.method} {request.path}\n{body}'.encode()).hexdigest()
+
+
+def replay(stored, fingerprint):
+    if stored.fingerprint != fingerprint:
+        return Response(
+            {'errors': 'Ключ уже использован для другого запроса.'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    response = Response(stored.data, status=stored.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Декоратор метода viewset'а для запросов с Idempotency-Key."""
+
+    @wraps(view)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not request.user.is_authenticated:
+            return view(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {'errors': f'{HEADER} длиннее {MAX_KEY_LENGTH} символов.'},
+                status=status.HTTP_400_BAD_REQUEST)
+        now = timezone.now()
+        stored = IdempotencyKey(
+            user=request.user, key=key,
+            fingerprint=request_fingerprint(request),
+            expires=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        )
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(
+                user=request.user, expires__lte=now).delete()
+            try:
+                with transaction.atomic():
+                    stored.save(force_insert=True)
+            except IntegrityError:
+                return replay(IdempotencyKey.objects.get(
+                    user=request.user, key=key), stored.fingerprint)
+            response = view(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                stored.delete()
+                return response
+            stored.status_code = response.status_code
+            stored.data = response.data
+            stored.save(update_fields=['status_code', 'data'])
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(batch_size=PURGE_BATCH_SIZE):
+    """Пачками удаляет истёкшие ключи всех пользователей."""
+    return delete_rows(
+        IdempotencyKey.objects.filter(expires__lte=timezone.now()),
+        batch_size)
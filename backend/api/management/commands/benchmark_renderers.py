@@ -0,0 +1,47 @@
+from timeit import repeat
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import RecipeListSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Сравнивает скорость рендереров на выдаче списка рецептов."""
+    help = ('Рендерит выдачу RecipeListSerializer стандартным '
+            'JSONRenderer, ORJSONRenderer и MessagePackRenderer.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=20)
+
+    def handle(self, *args, **options):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.select_related('author').prefetch_related(
+            'tags')[:options['recipes']]
+        data = RecipeListSerializer(
+            recipes, many=True, context={'request': request}
+        ).data
+        self.stdout.write(f'Рецептов в выдаче: {len(data)}')
+
+        baseline = None
+        for renderer in (JSONRenderer(), ORJSONRenderer(),
+                         MessagePackRenderer()):
+            size = len(renderer.render(data))
+            best = min(repeat(
+                lambda: renderer.render(data),
+                repeat=options['repeat'], number=options['number']
+            )) / options['number']
+            baseline = baseline or best
+            self.stdout.write(
+                f'{type(renderer).__name__:<22}'
+                f'{best * 1000:9.3f} мс {size:>10} байт '
+                f'x{baseline / best:.1f}'
+            )
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+SERVERS = {
+    'wsgi': ['foodgram.wsgi:application'],
+    'asgi': ['foodgram.asgi:application',
+             '--worker-class', 'uvicorn.workers.UvicornWorker'],
+    'gthread': ['foodgram.wsgi:application'],
+}
+POSTGRESQL = 'django.db.backends.postgresql'
+POOLED_POSTGRESQL = 'foodgram.pooled_postgresql'
+START_TIMEOUT = 30
+GUNICORN = 'from gunicorn.app.wsgiapp import run; run()'
+
+
+class Command(BaseCommand):
+    """Сравнивает пропускную способность серверов под нагрузкой."""
+    help = ('Поочерёдно запускает gunicorn с синхронными, uvicorn и '
+            'gthread воркерами (с пулом соединений на Postgres) и '
+            'нагружает частые GET-запросы API.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200)
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Потоков на воркер gthread.')
+        parser.add_argument('--server', action='append', dest='servers',
+                            choices=SERVERS, help='Какие серверы сравнить.')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь запроса, можно указать несколько.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        self.stdout.write(
+            f'{options["requests"]} запросов, {options["concurrency"]} '
+            f'одновременно: {", ".join(paths)}'
+        )
+        for name in options['servers'] or SERVERS:
+            server = subprocess.Popen(
+                [sys.executable, '-c', GUNICORN, *SERVERS[name],
+                 '--workers', str(options['workers']),
+                 '--bind', f'127.0.0.1:{options["port"]}',
+                 '--log-level', 'warning'],
+                cwd=settings.BASE_DIR,
+                env=self.server_env(name, options['threads'])
+            )
+            try:
+                self.wait_for_port(options['port'], server)
+                elapsed, latencies, errors = asyncio.run(self.load(
+                    options['port'], paths,
+                    options['requests'], options['concurrency']
+                ))
+            finally:
+                server.terminate()
+                server.wait()
+            latencies.sort()
+            self.stdout.write(
+                f'{name}: {len(latencies) / elapsed:8.1f} запр/с, '
+                f'p50 {self.percentile(latencies, 50):7.1f} мс, '
+                f'p99 {self.percentile(latencies, 99):7.1f} мс, '
+                f'ошибок {errors}'
+            )
+
+    @staticmethod
+    def server_env(name, threads):
+        """Окружение сервера: потоки gunicorn.conf.py и пул для gthread."""
+        env = dict(os.environ, GUNICORN_THREADS='1')
+        if name == 'gthread':
+            env['GUNICORN_THREADS'] = str(threads)
+            if settings.DATABASES['default']['ENGINE'] == POSTGRESQL:
+                env['DB_ENGINE'] = POOLED_POSTGRESQL
+                env.setdefault('DB_POOL_MAX_SIZE', str(threads))
+        return env
+
+    @staticmethod
+    def default_paths():
+        paths = ['/api/tags/', '/api/ingredients/?name=' + quote('са')]
+        recipe_id = Recipe.objects.values_list('pk', flat=True).first()
+        if recipe_id is not None:
+            paths.append(f'/api/recipes/{recipe_id}/')
+        return paths
+
+    @staticmethod
+    def wait_for_port(port, server):
+        deadline = time.monotonic() + START_TIMEOUT
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError('Сервер завершился при запуске.')
+            try:
+                socket.create_connection(('127.0.0.1', port), 1).close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('Сервер не запустился вовремя.')
+
+    @staticmethod
+    def percentile(values, percent):
+        if not values:
+            return 0
+        return values[min(len(values) - 1, len(values) * percent // 100)]
+
+    async def load(self, port, paths, total, concurrency):
+        latencies, errors = [], 0
+        counter = iter(range(total))
+
+        async def client():
+            nonlocal errors
+            for number in counter:
+                started = time.perf_counter()
+                try:
+                    status = await self.fetch(port, paths[number % len(paths)])
+                except OSError:
+                    status = None
+                if status == 200:
+                    latencies.append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, errors
+
+    @staticmethod
+    async def fetch(port, path):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            writer.write(
+                f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+                'Connection: close\r\n\r\n'.encode()
+            )
+            await writer.drain()
+            status_line = await reader.readline()
+            while await reader.read(65536):
+                pass
+        finally:
+            writer.close()
+        return int(status_line.split()[1]) if status_line else None
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.idempotency import purge_expired_keys
+from recipes.purge import PURGE_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    """Удаляет истёкшие ключи идемпотентности."""
+    help = ('Пачками удаляет сохранённые ответы на запросы с '
+            'Idempotency-Key, срок хранения которых истёк.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        purged = purge_expired_keys(options['batch_size'])
+        self.stdout.write(f'Удалено ключей: {purged}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from api import views  # noqa: F401 - регистрирует лимиты представлений
+from api.budgets import BUDGETS, VIOLATION_KINDS, violation_counts
+
+
+class Command(BaseCommand):
+    """Выводит лимиты представлений и число их нарушений."""
+    help = ('Показывает лимиты query_budget и сколько раз они были '
+            'превышены с момента очистки кеша.')
+
+    def handle(self, *args, **options):
+        for name, counts in violation_counts().items():
+            limits = ', '.join(
+                f'{kind} {limit}' for kind, limit
+                in zip(VIOLATION_KINDS, BUDGETS[name]) if limit is not None
+            )
+            violations = ', '.join(
+                f'{kind} {count}' for kind, count in counts.items())
+            self.stdout.write(f'{name} ({limits}): {violations}')
@@ -0,0 +1,98 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Выполняется в отдельном процессе с -X importtime, чтобы замерить
+# холодный старт так, как его видит воркер gunicorn. Аргументы: хост и
+# пути запросов; ответ не 200 завершает замер ошибкой.
+CHILD_SCRIPT = '''
+import json, sys, time
+started = time.perf_counter()
+from foodgram.wsgi import application
+loaded = time.perf_counter()
+from django.test import RequestFactory
+host, paths = sys.argv[1], sys.argv[2:]
+timings = {"load": loaded - started}
+statuses = {}
+for path in paths:
+    environ = RequestFactory().get(path, HTTP_HOST=host).environ
+    request_started = time.perf_counter()
+    response = application(
+        environ, lambda status, headers: statuses.setdefault(path, status))
+    b"".join(response)
+    response.close()
+    timings[path] = time.perf_counter() - request_started
+    if not statuses[path].startswith("200"):
+        sys.exit(f"{path}: {statuses[path]}")
+timings["first_response"] = timings["load"] + timings[paths[0]]
+print("STARTUP " + json.dumps(timings))
+'''
+
+
+class Command(BaseCommand):
+    """Профиль запуска воркера: импорты и время до первого ответа."""
+    help = ('Загружает foodgram.wsgi в отдельном процессе с '
+            '-X importtime и без прогрева, и с ним.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Путь первого запроса, можно несколько.')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/recipes/', '/api/tags/']
+        for warm_up in (False, True):
+            imports, timings = self.run_child(paths, warm_up)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                'С прогревом' if warm_up else 'Без прогрева'))
+            self.stdout.write(
+                f'  загрузка приложения {timings["load"] * 1000:8.1f} мс\n'
+                f'  до первого ответа   '
+                f'{timings["first_response"] * 1000:8.1f} мс'
+            )
+            for path in paths:
+                self.stdout.write(
+                    f'  {path:<30}{timings[path] * 1000:8.1f} мс')
+        self.report_imports(imports, options['top'])
+
+    def run_child(self, paths, warm_up):
+        host = next((host.lstrip('.') for host in settings.ALLOWED_HOSTS
+                     if host and host != '*'), 'localhost')
+        env = dict(os.environ, WARM_UP_ON_START=str(warm_up),
+                   DJANGO_SETTINGS_MODULE='foodgram.settings')
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT,
+             host, *paths],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        line = next((line for line in result.stdout.splitlines()
+                     if line.startswith('STARTUP ')), None)
+        if result.returncode or line is None:
+            raise CommandError(result.stderr[-2000:])
+        imports = []
+        for row in result.stderr.splitlines():
+            if not row.startswith('import time:') or 'self [us]' in row:
+                continue
+            own, cumulative, module = row[len('import time:'):].split('|')
+            imports.append((module.strip(), int(own), int(cumulative)))
+        return imports, json.loads(line[len('STARTUP '):])
+
+    def report_imports(self, imports, top):
+        packages = defaultdict(int)
+        for module, own, _ in imports:
+            packages[module.split('.')[0]] += own
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Импорт по пакетам (собственное время)'))
+        for package, own in sorted(
+                packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {package:<40}{own / 1000:8.1f} мс')
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'Самые долгие модули (вместе с вложенными импортами)'))
+        for module, _, cumulative in sorted(
+                imports, key=lambda item: -item[2])[:top]:
+            self.stdout.write(f'  {module:<50}{cumulative / 1000:8.1f} мс')
@@ -0,0 +1,95 @@
+import time
+from array import array
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Exists, OuterRef, Value
+from django.utils.functional import cached_property
+
+from recipes.models import MEMBERSHIPS_VERSION_KEY, Favorite, ShoppingList
+from users.models import Subscribe
+
+SET_KEY = 'memberships:{}:{}:{}'
+MEMBERSHIPS_TTL = 60 * 60 * 24
+
+
+class Memberships:
+    """Избранное, корзина и подписки пользователя.
+
+    Наборы хранятся в кеше как отсортированные массивы int64 под версией
+    пользователя и при первом обращении за запрос превращаются в
+    множества, так что флаги is_favorited, is_in_shopping_cart и
+    is_subscribed проверяются в памяти. Изменение любого набора меняет
+    версию (сигналы recipes.signals), и старые записи просто перестают
+    читаться. Наборы читаются из основной базы: реплика сразу после
+    смены версии может ещё не знать о записи, и устаревший набор
+    закешировался бы под новой версией.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    @cached_property
+    def version(self):
+        return cache.get_or_set(MEMBERSHIPS_VERSION_KEY.format(self.user.pk),
+                                time.time_ns, None)
+
+    def load(self, kind, queryset):
+        key = SET_KEY.format(self.user.pk, self.version, kind)
+        ids = array('q')
+        packed = cache.get(key)
+        if packed is None:
+            ids.extend(sorted(queryset))
+            cache.set(key, ids.tobytes(), MEMBERSHIPS_TTL)
+        else:
+            ids.frombytes(packed)
+        return set(ids)
+
+    @cached_property
+    def favorites(self):
+        return self.load('favorites', Favorite.objects.using(
+            DEFAULT_DB_ALIAS).filter(user=self.user).values_list(
+                'recipe_id', flat=True))
+
+    @cached_property
+    def shopping_cart(self):
+        return self.load('shopping_cart', ShoppingList.objects.using(
+            DEFAULT_DB_ALIAS).filter(user=self.user).values_list(
+                'recipe_id', flat=True))
+
+    @cached_property
+    def subscriptions(self):
+        return self.load('subscriptions', Subscribe.objects.using(
+            DEFAULT_DB_ALIAS).filter(user=self.user).values_list(
+                'author_id', flat=True))
+
+
+def get_memberships(request):
+    """Наборы текущего пользователя, общие для всего запроса.
+
+    Хранятся на исходном HttpRequest, поэтому подзапросы пакета
+    (/api/batch/) пользуются одним и тем же экземпляром.
+    """
+    http_request = getattr(request, '_request', request)
+    memberships = getattr(http_request, 'memberships', None)
+    if memberships is None or memberships.user != request.user:
+        memberships = Memberships(request.user)
+        http_request.memberships = memberships
+    return memberships
+
+
+def subscribed_annotation(user, author_field='pk'):
+    """Выражение «user подписан на автора» для аннотации is_subscribed."""
+    if user.is_anonymous:
+        return Value(False)
+    return Exists(Subscribe.objects.filter(
+        user=user, author_id=OuterRef(author_field)))
+
+
+def is_subscribed(request, author):
+    """Флаг подписки: из аннотации, если она есть, иначе из набора."""
+    if request.user.is_anonymous or author.pk == request.user.pk:
+        return False
+    if hasattr(author, 'is_subscribed'):
+        return author.is_subscribed
+    return author.pk in get_memberships(request).subscriptions
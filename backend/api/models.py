@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """Сохранённый ответ на запрос с заголовком Idempotency-Key"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='Пользователь'
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name='Ключ'
+    )
+    fingerprint = models.CharField(
+        max_length=64,
+        verbose_name='Отпечаток запроса'
+    )
+    status_code = models.PositiveSmallIntegerField(
+        null=True,
+        verbose_name='Код ответа'
+    )
+    data = models.JSONField(
+        null=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name='Тело ответа'
+    )
+    expires = models.DateTimeField(
+        db_index=True,
+        verbose_name='Хранить до'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'],
+                                    name='unique_idempotency_key'),
+        ]
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+
+    def __str__(self):
+        return self.key
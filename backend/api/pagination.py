@@ -1,6 +1,165 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import QuerySet
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+from recipes.models import RECIPE_COUNT_VERSION_KEY
+
+COUNT_KEY = 'recipes:count:{}:{}'
+COUNT_CACHE_SECONDS = 60
+APPROXIMATE_COUNT_THRESHOLD = 100000
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+    max_page_size = 100
+
+
+class EstimatedPage(Page):
+    """Страница, которая знает о следующей без точного числа объектов."""
+    has_more = False
+
+    def has_next(self):
+        return self.has_more
+
+    def next_page_number(self):
+        return self.number + 1
+
+
+class EstimatedCountPaginator(Paginator):
+    """Постраничный вывод с оценкой числа объектов вместо COUNT(*).
+
+    Чтобы оценка не отрезала хвост списка, страница выбирается на одну
+    запись больше и следующая страница есть, пока записи не кончились.
+    """
+
+    def __init__(self, object_list, per_page, estimate):
+        super().__init__(object_list, per_page)
+        self.count = estimate
+
+    def page(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            raise EmptyPage('На этой странице нет результатов.')
+        page = EstimatedPage(items[:self.per_page], number, self)
+        page.has_more = len(items) > self.per_page
+        self.count = max(self.count, bottom + len(items))
+        return page
+
+
+class RecipePagination(CustomPagination):
+    """Пагинация рецептов без точного COUNT(*) на каждой странице.
+
+    Число рецептов для набора фильтров кешируется на COUNT_CACHE_SECONDS
+    и сбрасывается при создании и удалении рецептов. Для большого
+    списка без фильтров на Postgres берётся оценка планировщика, а в
+    ответе выставляется count_is_approximate.
+    """
+    personal_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.approximate = False
+        self.personal = any(
+            name in request.query_params for name in self.personal_params)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        if not isinstance(object_list, QuerySet):
+            return Paginator(object_list, per_page)
+        estimate = self.estimate_count(object_list)
+        if estimate is not None:
+            self.approximate = True
+            return EstimatedCountPaginator(object_list, per_page, estimate)
+        paginator = Paginator(object_list, per_page)
+        paginator.count = self.cached_count(object_list)
+        return paginator
+
+    @staticmethod
+    def is_unfiltered(queryset):
+        """True, если условия запроса - только условия менеджера модели.
+
+        Менеджер рецептов сам скрывает помеченные на удаление, поэтому
+        пустым where не бывает; сравнивается SQL условий. Запрос с
+        difference/union/intersection отфильтрован в подзапросах.
+        """
+        if queryset.query.combinator:
+            return False
+        base = queryset.model._default_manager.all()
+        connection = connections[queryset.db]
+        try:
+            where = [
+                query.where.as_sql(query.get_compiler(queryset.db),
+                                   connection)
+                for query in (queryset.query, base.query)
+            ]
+        except EmptyResultSet:
+            return False
+        return where[0] == where[1]
+
+    @staticmethod
+    def table_estimate(connection, table):
+        """Число строк таблицы по статистике Postgres или None."""
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [table]
+            )
+            row = cursor.fetchone()
+        return row and row[0]
+
+    def estimate_count(self, queryset):
+        """Оценка из pg_class.reltuples для запроса без фильтров.
+
+        Оценка учитывает и строки, ждущие окончательного удаления, но
+        их доля мала: фоновая задача удаляет их пачками.
+        """
+        if self.personal or not self.is_unfiltered(queryset):
+            return None
+        estimate = self.table_estimate(connections[queryset.db],
+                                       queryset.model._meta.db_table)
+        if estimate is None or estimate < APPROXIMATE_COUNT_THRESHOLD:
+            return None
+        return estimate
+
+    def cached_count(self, queryset):
+        # Списки избранного и корзины меняются с каждым нажатием
+        # пользователя и сами по себе короткие.
+        if self.personal:
+            return queryset.count()
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        signature = hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+        version = cache.get_or_set(RECIPE_COUNT_VERSION_KEY, time.time_ns,
+                                   None)
+        key = COUNT_KEY.format(version, signature)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, COUNT_CACHE_SECONDS)
+        return count
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('count_is_approximate', self.approximate),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
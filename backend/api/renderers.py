@@ -0,0 +1,53 @@
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Типы, которые orjson не умеет кодировать сам, а также даты, которые
+# он кодирует иначе, отдаются стандартному кодировщику DRF, поэтому
+# они выводятся так же, как в JSONRenderer.
+encode_default = JSONEncoder().default
+
+LINE_SEPARATOR = '\u2028'.encode()
+PARAGRAPH_SEPARATOR = '\u2029'.encode()
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSON-рендерер на orjson.
+
+    Отличия от JSONRenderer: дробные числа могут быть записаны иначе
+    (1e16 вместо 1e+16, значение то же), а NaN и бесконечности
+    становятся null, а не ошибкой. orjson умеет только отступ в 2
+    пробела, поэтому ответы с другим отступом рендерит JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        # Ключи-числа (например, в /api/stats/) DRF превращает в строки.
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=encode_default, option=option)
+        # Как и DRF, экранируем U+2028 и U+2029 для совместимости с JS.
+        if LINE_SEPARATOR in ret or PARAGRAPH_SEPARATOR in ret:
+            ret = ret.replace(LINE_SEPARATOR, b'\\u2028').replace(
+                PARAGRAPH_SEPARATOR, b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Рендерер в формат MessagePack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
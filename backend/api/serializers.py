@@ -7,14 +7,68 @@ from rest_framework.exceptions import ValidationError
 from rest_framework.fields import SerializerMethodField
 from djoser.serializers import UserSerializer, UserCreateSerializer
 
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe,
-                            Recipe, Tag, ShoppingList)
+from jobs.queue import enqueue
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from recipes.cook_index import notify_on_commit
+from stats.models import (AuthorStat, DailyRecipeStat, IngredientStat,
+                          RecipeStat, TagStat)
 from users.models import Subscribe
+from .fields import ImageVariantsField, RecipeImageField
+from .memberships import get_memberships, is_subscribed
 
 
 User = get_user_model()
 
 
+def query_list(request, name):
+    """Значения параметра запроса через запятую или None, если его нет."""
+    if request is None or name not in request.query_params:
+        return None
+    return {
+        value.strip()
+        for item in request.query_params.getlist(name)
+        for value in item.split(',') if value.strip()
+    }
+
+
+class SparseFieldsMixin:
+    """Выбор полей выдачи параметрами ?fields=, ?omit= и ?expand=.
+
+    Параметры действуют только на сериализатор верхнего уровня. Поля из
+    collapsed_fields без упоминания в ?expand= заменяются компактным
+    представлением; без ?expand= выдача остаётся полной.
+    """
+    collapsed_fields = {}
+
+    @classmethod
+    def field_selection(cls, request):
+        """Возвращает выводимые поля и поля в компактном виде."""
+        fields = query_list(request, 'fields')
+        omit = query_list(request, 'omit') or set()
+        names = [
+            name for name in cls.Meta.fields
+            if (fields is None or name in fields) and name not in omit
+        ]
+        expand = query_list(request, 'expand')
+        if expand is None:
+            return names, set()
+        return names, set(cls.collapsed_fields).difference(expand)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None or 'request' not in self.context:
+            return fields
+        names, collapsed = self.field_selection(self.context['request'])
+        return {
+            name: (self.collapsed_fields[name]() if name in collapsed
+                   else fields[name])
+            for name in names
+        }
+
+
 class MineCreateUserSerializers(UserCreateSerializer):
     """Сериализатор для модели User для регистрации"""
     class Meta:
@@ -22,15 +76,12 @@ class MineCreateUserSerializers(UserCreateSerializer):
         fields = ('email', 'username', 'first_name', 'last_name', 'password', )
 
 
-class MineUserSerializer(UserSerializer):
+class MineUserSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализотор для просмотра модели User"""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(user=user, author=obj).exists()
+        return is_subscribed(self.context['request'], obj)
 
     class Meta:
         model = User
@@ -40,6 +91,7 @@ class MineUserSerializer(UserSerializer):
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Сериализатор для короткого вывода рецепта"""
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -47,15 +99,19 @@ class RecipeShortSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time'
         )
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для подписки на автора"""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
     recipes_count = SerializerMethodField(read_only=True)
     recipes = SerializerMethodField(read_only=True)
+    collapsed_fields = {
+        'recipes': lambda: SerializerMethodField(method_name='get_recipe_ids')
+    }
 
     class Meta(MineUserSerializer.Meta):
         fields = MineUserSerializer.Meta.fields + (
@@ -79,23 +135,29 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
     def get_is_subscribed(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(user=user, author=obj).exists()
+        return is_subscribed(self.context['request'], obj)
 
     def get_recipes_count(self, author):
+        if hasattr(author, 'recipes_count'):
+            return author.recipes_count
         return author.recipes.count()
 
-    def get_recipes(self, author):
+    def limited_recipes(self, author):
         request = self.context.get('request')
         limit = request.GET.get('recipes_limit')
         recipes = author.recipes.all()
         if limit:
             recipes = recipes[:int(limit)]
-        serializer = RecipeShortSerializer(recipes, many=True, read_only=True)
+        return recipes
+
+    def get_recipes(self, author):
+        serializer = RecipeShortSerializer(self.limited_recipes(author),
+                                           many=True, read_only=True)
         return serializer.data
 
+    def get_recipe_ids(self, author):
+        return list(self.limited_recipes(author).values_list('id', flat=True))
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для ингридиентов"""
@@ -131,37 +193,44 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'measurement_unit', 'amount']
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Получение рецепта"""
     ingredients = serializers.SerializerMethodField()
     tags = TagSerializer(many=True)
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     author = MineUserSerializer()
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    collapsed_fields = {
+        'author': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+        'tags': lambda: serializers.PrimaryKeyRelatedField(
+            many=True, read_only=True),
+    }
 
     def get_ingredients(self, obj):
         return RecipeIngredientsSerializer(
-            IngredientInRecipe.objects.filter(recipe=obj).all(), many=True
+            obj.ingredientinrecipe_set.all(), many=True
         ).data
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
+        request = self.context['request']
+        if request.user.is_anonymous:
             return False
-        return Favorite.objects.filter(user=user, recipe=obj).exists()
+        return obj.id in get_memberships(request).favorites
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        if user.is_anonymous:
+        request = self.context['request']
+        if request.user.is_anonymous:
             return False
-        return ShoppingList.objects.filter(user=user, recipe=obj).exists()
+        return obj.id in get_memberships(request).shopping_cart
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time', )
+                  'name', 'image', 'image_variants', 'text',
+                  'cooking_time', )
 
 
 class IngredientCreateRecipeSerializez(serializers.ModelSerializer):
@@ -189,7 +258,7 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         queryset=Tag.objects.all(),
         many=True
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
     cooking_time = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -235,12 +304,19 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             create_ingredients
         )
 
+    @staticmethod
+    def contents_changed(recipe_id):
+        """Обновляет индексы, построенные по составу рецепта."""
+        enqueue('recipes.refresh_similar', recipe_id=recipe_id)
+        notify_on_commit([recipe_id])
+
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
         self.create_ingredients(ingredients=ingredients, recipe=recipe)
         recipe.tags.set(tags)
+        self.contents_changed(recipe.pk)
         return recipe
 
     def update(self, instance, validated_data):
@@ -252,6 +328,8 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             instance.ingredients.clear()
             self.create_ingredients(recipe=instance,
                                     ingredients=ingredients)
+        if tags is not None or ingredients is not None:
+            self.contents_changed(instance.pk)
 
         return super().update(instance, validated_data)
 
@@ -263,3 +341,55 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             IngredientInRecipe.objects.filter(recipe=obj).all(), many=True
         ).data
         return representation
+
+
+class IngredientStatSerializer(serializers.ModelSerializer):
+    """Ингредиент и число рецептов с ним"""
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = IngredientStat
+        fields = ['id', 'name', 'measurement_unit', 'recipes_count']
+
+
+class TagStatSerializer(serializers.ModelSerializer):
+    """Тег и число рецептов с ним"""
+    id = serializers.IntegerField(source='tag_id')
+    name = serializers.CharField(source='tag.name')
+    slug = serializers.CharField(source='tag.slug')
+
+    class Meta:
+        model = TagStat
+        fields = ['id', 'name', 'slug', 'recipes_count']
+
+
+class RecipeStatSerializer(serializers.ModelSerializer):
+    """Рецепт и число добавлений в избранное"""
+    id = serializers.IntegerField(source='recipe_id')
+    name = serializers.CharField(source='recipe.name')
+
+    class Meta:
+        model = RecipeStat
+        fields = ['id', 'name', 'favorites_count']
+
+
+class AuthorStatSerializer(serializers.ModelSerializer):
+    """Автор и число подписчиков"""
+    id = serializers.IntegerField(source='author_id')
+    username = serializers.CharField(source='author.username')
+
+    class Meta:
+        model = AuthorStat
+        fields = ['id', 'username', 'followers_count']
+
+
+class DailyRecipeStatSerializer(serializers.ModelSerializer):
+    """Число новых рецептов за день"""
+
+    class Meta:
+        model = DailyRecipeStat
+        fields = ['date', 'recipes_count']
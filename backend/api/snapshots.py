@@ -0,0 +1,115 @@
+"""Готовые ответы со всем каталогом тегов и ингредиентов.
+
+Каталог рендерится один раз на версию: JSON и его сжатые gzip и brotli
+копии кладутся в кеш под версией каталога, которую сигналы меняют при
+каждом изменении тегов или ингредиентов. Список без фильтров отдаётся
+из этих байтов без запросов к базе и сериализаторов, с ETag версии.
+
+Снимок новой версии собирает задача api.build_snapshot, которую
+сигналы ставят один раз на транзакцию. Если запрос пришёл раньше,
+снимок собирает только один из запросов (блокировка cache.add), а
+остальные тем временем отвечают обычным списком.
+"""
+import time
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+
+from foodgram.static import COMPRESSORS, ENCODINGS, accepted_encodings
+from recipes.models import CATALOGUE_VERSION_KEY, Ingredient, Tag
+from .renderers import ORJSONRenderer
+from .serializers import IngredientSerializer, TagSerializer
+
+SNAPSHOT_KEY = 'catalogue:{}:{}'
+SNAPSHOT_TTL = 60 * 60 * 24
+BUILD_LOCK_KEY = 'catalogue:{}:{}:building'
+BUILD_LOCK_SECONDS = 60
+CATALOGUES = {
+    'tags': (Tag, TagSerializer),
+    'ingredients': (Ingredient, IngredientSerializer),
+}
+
+# Последний снимок каждого каталога в памяти процесса.
+_snapshots = {}
+
+
+class Snapshot:
+    """Тело ответа со всем каталогом в каждой из кодировок."""
+
+    def __init__(self, version, bodies):
+        self.version = version
+        self.bodies = bodies
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in accepted and encoding in self.bodies:
+                return encoding
+        return None
+
+    def etag(self, encoding):
+        if encoding:
+            return f'"{self.version}-{encoding}"'
+        return f'"{self.version}"'
+
+
+def render_catalogue(name):
+    model, serializer = CATALOGUES[name]
+    body = ORJSONRenderer().render(
+        serializer(model.objects.all(), many=True).data)
+    bodies = {None: body}
+    for encoding, suffix in ENCODINGS:
+        bodies[encoding] = COMPRESSORS[suffix](body)
+    return bodies
+
+
+def build_snapshot(name, version):
+    """Собирает снимок версии или возвращает None, если его уже
+    собирает другой запрос или задача."""
+    lock = BUILD_LOCK_KEY.format(name, version)
+    if not cache.add(lock, True, BUILD_LOCK_SECONDS):
+        return None
+    try:
+        bodies = render_catalogue(name)
+    except Exception:
+        cache.delete(lock)
+        raise
+    cache.set(SNAPSHOT_KEY.format(name, version), bodies, SNAPSHOT_TTL)
+    return bodies
+
+
+def get_snapshot(name):
+    """Снимок текущей версии каталога или None, пока его собирают."""
+    version = cache.get_or_set(CATALOGUE_VERSION_KEY.format(name),
+                               time.time_ns, None)
+    snapshot = _snapshots.get(name)
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    bodies = cache.get(SNAPSHOT_KEY.format(name, version))
+    if bodies is None:
+        bodies = build_snapshot(name, version)
+        if bodies is None:
+            return None
+    snapshot = _snapshots[name] = Snapshot(version, bodies)
+    return snapshot
+
+
+def snapshot_response(request, name):
+    """Ответ из снимка для списка без параметров, иначе None."""
+    if request.query_params or request.accepted_renderer.format != 'json':
+        return None
+    snapshot = get_snapshot(name)
+    if snapshot is None:
+        return None
+    encoding = snapshot.choose(request.headers.get('Accept-Encoding', ''))
+    etag = snapshot.etag(encoding)
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot.bodies[encoding],
+                                content_type='application/json')
+        if encoding:
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Vary'] = 'Accept, Accept-Encoding'
+    return response
@@ -0,0 +1,9 @@
+from jobs.queue import task
+
+from .snapshots import get_snapshot
+
+
+@task('api.build_snapshot', batch=True)
+def build_snapshots(payloads):
+    for name in {payload['catalogue'] for payload in payloads}:
+        get_snapshot(name)
@@ -0,0 +1,8 @@
+"""URL проекта с асинхронными представлениями, как при ASYNC_VIEWS=True."""
+from django.urls import include, path
+
+from api.urls import app_name, async_urlpatterns, urlpatterns
+
+urlpatterns = [
+    path('api/', include((async_urlpatterns + urlpatterns, app_name))),
+]
@@ -0,0 +1,55 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(
+    CACHES=LOCMEM_CACHES, JOB_WORKER_THREADS=0,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ApiTestCase(APITestCase):
+    """Тест API с отдельным кешем в памяти и без потоков очереди."""
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(email, **extra):
+        return User.objects.create_user(
+            email=email, username=email.split('@')[0], password='pass',
+            first_name='Имя', last_name='Фамилия', **extra)
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    @staticmethod
+    def create_recipe(author, name='Рецепт', tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Текст', cooking_time=10)
+        recipe.tags.set(tags)
+        for ingredient, amount in ingredients:
+            IngredientInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount)
+        return recipe
+
+    @staticmethod
+    def create_tag(slug):
+        return Tag.objects.create(name=slug, slug=slug, color='#FF0000')
+
+    @staticmethod
+    def create_ingredient(name, unit='г'):
+        return Ingredient.objects.create(name=name, measurement_unit=unit)
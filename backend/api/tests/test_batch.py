@@ -0,0 +1,65 @@
+import asyncio
+
+from django.test import override_settings
+from django.urls import resolve
+
+from api.views import TagViewSet
+from .base import ApiTestCase
+
+
+class BatchTestCase(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('batch@example.com')
+        self.client = self.client_for(self.user)
+        self.tag = self.create_tag('breakfast')
+
+    def batch(self, *urls, **headers):
+        response = self.client.post('/api/batch/', {'requests': list(urls)},
+                                    format='json', **headers)
+        self.assertEqual(response.status_code, 200)
+        return {item['url']: item for item in response.json()}
+
+
+@override_settings(ROOT_URLCONF='api.tests.async_urls')
+class AsyncBatchTest(BatchTestCase):
+
+    def test_async_route_exposes_sync_view(self):
+        func = resolve('/api/tags/').func
+        self.assertTrue(asyncio.iscoroutinefunction(func))
+        self.assertIs(func.cls, TagViewSet)
+        self.assertFalse(asyncio.iscoroutinefunction(func.sync_view))
+
+    def test_batch_dispatches_to_sync_view(self):
+        results = self.batch('/api/tags/', f'/api/tags/{self.tag.pk}/')
+        self.assertEqual(results['/api/tags/']['status'], 200)
+        self.assertEqual(results['/api/tags/']['body'][0]['slug'],
+                         'breakfast')
+        item = results[f'/api/tags/{self.tag.pk}/']
+        self.assertEqual(item['status'], 200)
+        self.assertEqual(item['body']['slug'], 'breakfast')
+
+
+class BatchTest(BatchTestCase):
+
+    def test_catalogues_are_decoded_json_despite_accept_encoding(self):
+        self.create_ingredient('соль')
+        results = self.batch('/api/tags/', '/api/ingredients/',
+                             HTTP_ACCEPT_ENCODING='br, gzip')
+        tags = results['/api/tags/']
+        self.assertEqual(tags['status'], 200)
+        self.assertEqual(tags['body'], [{
+            'id': self.tag.pk, 'name': 'breakfast',
+            'color': '#FF0000', 'slug': 'breakfast',
+        }])
+        ingredients = results['/api/ingredients/']
+        self.assertEqual(ingredients['status'], 200)
+        self.assertEqual(ingredients['body'][0]['name'], 'соль')
+
+    def test_streaming_response_is_rejected_per_item(self):
+        url = '/api/recipes/download_shopping_cart/'
+        results = self.batch(url, '/api/tags/')
+        self.assertEqual(results[url]['status'], 400)
+        self.assertIn('errors', results[url]['body'])
+        self.assertEqual(results['/api/tags/']['status'], 200)
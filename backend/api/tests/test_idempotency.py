@@ -0,0 +1,88 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.response import Response
+
+from api.models import IdempotencyKey
+from api.views import RecipeViewSet
+from recipes.models import Favorite
+from .base import ApiTestCase
+
+KEY = {'HTTP_IDEMPOTENCY_KEY': 'key-1'}
+
+
+class IdempotentViewTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('user@example.com')
+        self.client = self.client_for(self.user)
+        author = self.create_user('author@example.com')
+        self.recipe = self.create_recipe(author)
+        self.other = self.create_recipe(author, name='Другой')
+        self.url = f'/api/recipes/{self.recipe.pk}/favorite/'
+
+    def test_repeat_replays_stored_response(self):
+        first = self.client.post(self.url, **KEY)
+        self.assertEqual(first.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', first)
+        second = self.client.post(self.url, **KEY)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 1)
+
+    def test_reused_key_for_other_request_is_rejected(self):
+        self.assertEqual(self.client.post(self.url, **KEY).status_code, 201)
+        other_requests = (
+            lambda: self.client.post(self.url, {'note': 'другое тело'},
+                                     format='json', **KEY),
+            lambda: self.client.post(
+                f'/api/recipes/{self.other.pk}/favorite/', **KEY),
+            lambda: self.client.delete(self.url, **KEY),
+        )
+        for send in other_requests:
+            response = send()
+            self.assertEqual(response.status_code, 422)
+            self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(Favorite.objects.filter(user=self.user).count(), 1)
+
+    def test_validation_error_is_not_stored(self):
+        response = self.client.post('/api/recipes/', {'name': ''},
+                                    format='json', **KEY)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.client.post(self.url, **KEY).status_code, 201)
+
+    def test_server_error_is_not_stored(self):
+        with mock.patch.object(RecipeViewSet, 'add_to',
+                               return_value=Response(status=503)):
+            response = self.client.post(self.url, **KEY)
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        response = self.client.post(self.url, **KEY)
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+
+class PurgeIdempotencyKeysTest(ApiTestCase):
+
+    def create_key(self, user, key, expires_in):
+        return IdempotencyKey.objects.create(
+            user=user, key=key, fingerprint='0' * 64,
+            expires=timezone.now() + timedelta(seconds=expires_in))
+
+    def test_expired_keys_of_all_users_are_deleted(self):
+        first = self.create_user('first@example.com')
+        second = self.create_user('second@example.com')
+        for number in range(3):
+            self.create_key(first, f'old-{number}', -60)
+        self.create_key(second, 'old', -60)
+        live = self.create_key(second, 'live', 60)
+        out = StringIO()
+        call_command('purge_idempotency_keys', batch_size=2, stdout=out)
+        self.assertIn('Удалено ключей: 4', out.getvalue())
+        self.assertQuerysetEqual(IdempotencyKey.objects.all(), [live])
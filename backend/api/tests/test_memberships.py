@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.db import router
+
+from api.memberships import Memberships
+from recipes.models import Favorite
+from recipes.purge import purge_deleted, soft_delete_users
+from users.models import Subscribe
+from .base import ApiTestCase
+
+
+class MembershipsTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author@example.com')
+        self.user = self.create_user('user@example.com')
+        self.recipe = self.create_recipe(self.author)
+
+    def is_favorited(self):
+        response = self.client_for(self.user).get(
+            f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data['is_favorited']
+
+    def test_admin_delete_changes_cached_favorites(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_for(self.user).post(
+                f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertTrue(self.is_favorited())
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.get(user=self.user).delete()
+        self.assertFalse(self.is_favorited())
+
+    def test_purge_changes_followers_subscriptions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.create(user=self.user, author=self.author)
+        self.assertEqual(Memberships(self.user).subscriptions,
+                         {self.author.pk})
+        soft_delete_users(type(self.author).objects.filter(
+            pk=self.author.pk))
+        with self.captureOnCommitCallbacks(execute=True):
+            while purge_deleted():
+                pass
+        self.assertEqual(Memberships(self.user).subscriptions, set())
+
+    def test_sets_are_read_from_primary(self):
+        with mock.patch.object(router, 'db_for_read',
+                               side_effect=AssertionError):
+            memberships = Memberships(self.user)
+            self.assertEqual(memberships.favorites, set())
+            self.assertEqual(memberships.shopping_cart, set())
+            self.assertEqual(memberships.subscriptions, set())
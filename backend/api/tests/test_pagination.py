@@ -0,0 +1,58 @@
+from unittest import mock
+
+from api.pagination import RecipePagination
+from recipes.models import Recipe
+from .base import ApiTestCase
+
+ESTIMATE = 150000
+
+
+class RecipeCountEstimateTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author@example.com')
+        self.other = self.create_user('other@example.com')
+        for number in range(3):
+            self.create_recipe(self.author, name=f'Рецепт {number}')
+        self.create_recipe(self.other)
+        patcher = mock.patch.object(RecipePagination, 'table_estimate',
+                                    return_value=ESTIMATE)
+        self.table_estimate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_manager_filter_counts_as_unfiltered(self):
+        self.assertTrue(RecipePagination.is_unfiltered(Recipe.objects.all()))
+        self.assertFalse(RecipePagination.is_unfiltered(
+            Recipe.objects.filter(author=self.author)))
+        self.assertFalse(RecipePagination.is_unfiltered(
+            Recipe.objects.filter(pk__in=[])))
+        self.assertFalse(RecipePagination.is_unfiltered(
+            Recipe.objects.difference(Recipe.objects.filter(
+                author=self.author))))
+
+    def test_unfiltered_list_uses_estimate(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], ESTIMATE)
+        self.assertIs(response.data['count_is_approximate'], True)
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNone(response.data['next'])
+        self.table_estimate.assert_called_once()
+
+    def test_filtered_list_counts_exactly(self):
+        response = self.client.get('/api/recipes/',
+                                   {'author': self.author.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 3)
+        self.assertIs(response.data['count_is_approximate'], False)
+        self.table_estimate.assert_not_called()
+
+    def test_personal_filter_counts_exactly(self):
+        client = self.client_for(self.other)
+        for params in ({'is_favorited': 0}, {'is_in_shopping_cart': 0}):
+            response = client.get('/api/recipes/', params)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data['count'], 4)
+            self.assertIs(response.data['count_is_approximate'], False)
+        self.table_estimate.assert_not_called()
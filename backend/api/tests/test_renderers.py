@@ -0,0 +1,32 @@
+import json
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+
+
+class ORJSONRendererTest(SimpleTestCase):
+
+    def assert_renders_like_drf(self, data, media_type=None):
+        self.assertEqual(ORJSONRenderer().render(data, media_type),
+                         JSONRenderer().render(data, media_type))
+
+    def test_int_keys(self):
+        self.assert_renders_like_drf({1: 'один', 2: {3: Decimal('4.5')}})
+
+    def test_line_separators_are_escaped(self):
+        self.assert_renders_like_drf({'text': 'a b c'})
+
+    def test_indent(self):
+        data = {'items': [1, {'a': None}]}
+        for indent in (2, 4):
+            self.assert_renders_like_drf(
+                data, f'application/json; indent={indent}')
+
+    def test_float_and_nan_differences(self):
+        rendered = ORJSONRenderer().render({'big': 1e16, 'nan': float('nan')})
+        self.assertEqual(json.loads(rendered), {'big': 1e16, 'nan': None})
+        with self.assertRaises(ValueError):
+            JSONRenderer().render({'nan': float('nan')})
@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+
+from api import snapshots
+from jobs.models import Job
+from jobs.queue import run_due
+from recipes.models import CATALOGUE_VERSION_KEY, Ingredient
+from .base import ApiTestCase
+
+
+class CatalogueSnapshotTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        snapshots._snapshots.clear()
+        self.addCleanup(snapshots._snapshots.clear)
+        self.render = mock.patch.object(
+            snapshots, 'render_catalogue',
+            wraps=snapshots.render_catalogue).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def names(self):
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        return sorted(item['name'] for item in response.json())
+
+    def test_change_builds_snapshot_once_in_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                for name in ('соль', 'сахар', 'перец'):
+                    Ingredient.objects.create(name=name,
+                                              measurement_unit='г')
+        self.assertEqual(Job.objects.filter(
+            name='api.build_snapshot').count(), 1)
+        run_due(10)
+        self.assertEqual(self.render.call_count, 1)
+        self.assertEqual(self.names(), ['перец', 'сахар', 'соль'])
+        self.assertEqual(self.render.call_count, 1)
+
+    def test_request_during_build_uses_regular_list(self):
+        Ingredient.objects.create(name='соль', measurement_unit='г')
+        version = cache.get_or_set(
+            CATALOGUE_VERSION_KEY.format('ingredients'), 1, None)
+        cache.add(snapshots.BUILD_LOCK_KEY.format('ingredients', version),
+                  True)
+        response = self.client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual([item['name'] for item in response.json()],
+                         ['соль'])
+        self.render.assert_not_called()
@@ -0,0 +1,45 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from users.models import Subscribe
+from .base import ApiTestCase
+
+
+class UserListQueriesTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader@example.com')
+        self.client = self.client_for(self.user)
+
+    def add_authors(self, count, start=0):
+        authors = [
+            self.create_user(f'author{number}@example.com')
+            for number in range(start, start + count)
+        ]
+        Subscribe.objects.create(user=self.user, author=authors[0])
+        return authors
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/users/', {'limit': 100})
+        self.assertEqual(response.status_code, 200)
+        return len(context), response.data['results']
+
+    def test_query_count_does_not_grow_with_page(self):
+        self.add_authors(5)
+        small, _ = self.count_queries()
+        self.add_authors(95, start=5)
+        # Токен, число пользователей и страница с аннотацией подписки.
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/users/', {'limit': 100})
+        self.assertEqual(len(response.data['results']), 100)
+        self.assertEqual(small, 3)
+
+    def test_is_subscribed_flags(self):
+        followed, other = self.add_authors(2)
+        _, results = self.count_queries()
+        flags = {item['id']: item['is_subscribed'] for item in results}
+        self.assertIs(flags[followed.pk], True)
+        self.assertIs(flags[other.pk], False)
+        self.assertIs(flags[self.user.pk], False)
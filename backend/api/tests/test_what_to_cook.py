@@ -0,0 +1,60 @@
+from unittest import mock
+
+from api.budgets import BudgetScope
+from recipes.cook_index import CookIndex
+from recipes.models import IngredientInRecipe
+from .base import ApiTestCase
+
+
+class WhatToCookTest(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = CookIndex()
+        patcher = mock.patch('api.views.cook_index', self.index)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        author = self.create_user('cook@example.com')
+        self.egg = self.create_ingredient('яйцо', 'шт')
+        self.milk = self.create_ingredient('молоко', 'мл')
+        self.fish = self.create_ingredient('рыба')
+        self.recipe = self.create_recipe(
+            author, 'Омлет', ingredients=[(self.egg, 2), (self.milk, 100)])
+
+    def found(self, *ingredients):
+        response = self.client.get('/api/recipes/what_to_cook/', {
+            'ingredients': ','.join(str(item.pk) for item in ingredients),
+            'max_missing': 0,
+        })
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_editing_ingredient_row_updates_index(self):
+        self.assertEqual(self.found(self.egg, self.milk), [self.recipe.pk])
+        row = IngredientInRecipe.objects.get(
+            recipe=self.recipe, ingredient=self.milk)
+        with self.captureOnCommitCallbacks(execute=True):
+            row.ingredient = self.fish
+            row.save()
+        self.assertEqual(self.found(self.egg, self.milk), [])
+        self.assertEqual(self.found(self.egg, self.fish), [self.recipe.pk])
+
+    def test_deleting_ingredient_row_updates_index(self):
+        self.assertEqual(self.found(self.egg), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            IngredientInRecipe.objects.filter(
+                recipe=self.recipe, ingredient=self.milk).delete()
+        self.assertEqual(self.found(self.egg), [self.recipe.pk])
+
+    def test_index_rebuild_is_outside_row_budget(self):
+        self.create_recipe(self.recipe.author, 'Уха',
+                           ingredients=[(self.fish, 300), (self.milk, 50)])
+        scope_init = BudgetScope.__init__
+
+        def small_budget(scope, name, timeout, max_queries, max_rows):
+            scope_init(scope, name, timeout, max_queries, 2)
+
+        with mock.patch.object(BudgetScope, '__init__', small_budget):
+            for _ in range(2):
+                self.assertEqual(self.found(self.egg), [])
+        self.assertNotEqual(self.index._version, -1)
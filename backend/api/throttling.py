@@ -0,0 +1,146 @@
+"""Ограничение частоты запросов по алгоритму token bucket.
+
+Корзины живут в памяти процесса, и обычный запрос проверяется без
+обращения к кешу. Раз в SYNC_SECONDS секунд или после SYNC_BATCH
+запросов израсходованные токены сводятся с общим состоянием в кеше
+Django. Так лимит действует сразу на все воркеры, пусть и с погрешностью
+в пределах одного пакета на процесс.
+"""
+import threading
+
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import SimpleRateThrottle
+
+SYNC_SECONDS = 1.0
+SYNC_BATCH = 10
+MAX_BUCKETS = 10000
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+class Bucket:
+    """Заполненность корзины, которая утекает с постоянной скоростью."""
+    __slots__ = ('level', 'updated', 'pending', 'synced', 'lock')
+
+    def __init__(self, level, now):
+        self.level = level
+        self.updated = now
+        self.pending = 0
+        self.synced = now
+        self.lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Лимит по области view.throttle_scope.
+
+    Пользователь определяется по id, аноним - по IP-адресу.
+    """
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        # Область и лимит известны только после разбора запроса.
+        pass
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.scope = self.get_scope(request, view)
+        if self.scope is None:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        self.key = self.get_cache_key(request, view)
+        self.now = self.timer()
+        bucket = self.get_bucket()
+        with bucket.lock:
+            self.leak(bucket)
+            allowed = bucket.level + 1 <= self.num_requests
+            if allowed:
+                bucket.level += 1
+                bucket.pending += 1
+            self.level = bucket.level
+            need_sync = (bucket.pending >= SYNC_BATCH
+                         or self.now - bucket.synced >= SYNC_SECONDS)
+        if need_sync:
+            self.sync(bucket)
+        return allowed
+
+    def get_bucket(self):
+        bucket = _buckets.get(self.key)
+        if bucket is not None:
+            return bucket
+        bucket = Bucket(self.shared_level(), self.now)
+        with _buckets_lock:
+            if len(_buckets) >= MAX_BUCKETS:
+                # Несведённых токенов у остальных корзин нет, их
+                # состояние восстановится из кеша.
+                for key, other in list(_buckets.items()):
+                    if not other.pending:
+                        del _buckets[key]
+            return _buckets.setdefault(self.key, bucket)
+
+    def leak(self, bucket):
+        elapsed = self.now - bucket.updated
+        bucket.level = max(
+            0, bucket.level - elapsed * self.num_requests / self.duration)
+        bucket.updated = self.now
+
+    def shared_level(self):
+        state = cache.get(self.key)
+        if state is None:
+            return 0
+        level, updated = state
+        leaked = (self.now - updated) * self.num_requests / self.duration
+        return max(0, level - leaked)
+
+    def sync(self, bucket):
+        """Добавляет израсходованные здесь токены к общему состоянию."""
+        with bucket.lock:
+            pending, bucket.pending = bucket.pending, 0
+            bucket.synced = self.now
+        level = min(self.shared_level() + pending, self.num_requests)
+        cache.set(self.key, (level, self.now), self.duration)
+        with bucket.lock:
+            bucket.level = level + bucket.pending
+            bucket.updated = self.now
+
+    def wait(self):
+        return max(0, (self.level + 1 - self.num_requests)
+                   * self.duration / self.num_requests)
+
+
+class ReadThrottle(TokenBucketThrottle):
+    """Чтение: отдельные лимиты для анонимов и пользователей."""
+
+    def get_scope(self, request, view):
+        if request.method not in SAFE_METHODS:
+            return None
+        if request.user.is_authenticated:
+            return 'user_read'
+        return 'anon_read'
+
+
+class WriteThrottle(TokenBucketThrottle):
+    """Создание и изменение: рецепты, избранное, корзина, подписки."""
+
+    def get_scope(self, request, view):
+        if request.method in SAFE_METHODS:
+            return None
+        return 'write'
+
+
+class ShoppingCartDownloadThrottle(TokenBucketThrottle):
+    """Выгрузка списка покупок."""
+
+    def get_scope(self, request, view):
+        return 'shopping_cart_download'
@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientViewSet, RecipeViewSet,
-                    TagViewSet, CastomUserViewSet)
+from .async_views import async_view
+from .views import (BatchView, IngredientViewSet, RecipeViewSet,
+                    StatsView, TagViewSet, CastomUserViewSet)
 
 app_name = 'api'
 
@@ -13,7 +15,22 @@ router.register('ingredients', IngredientViewSet)
 router.register('tags', TagViewSet)
 router.register('recipes', RecipeViewSet)
 
-urlpatterns = [
+async_urlpatterns = [
+    path('tags/', async_view(TagViewSet.as_view({'get': 'list'})),
+         name='tags-list'),
+    path('ingredients/',
+         async_view(IngredientViewSet.as_view({'get': 'list'})),
+         name='ingredients-list'),
+    path('recipes/<int:pk>/', async_view(RecipeViewSet.as_view({
+        'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+        'delete': 'destroy'
+    })), name='recipes-detail'),
+]
+
+urlpatterns = async_urlpatterns if settings.ASYNC_VIEWS else []
+urlpatterns += [
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('stats/', StatsView.as_view(), name='stats'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
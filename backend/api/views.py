@@ -1,47 +1,87 @@
+import copy
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import Count, Prefetch, Q, Sum
+from django.http import QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework import viewsets
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from recipes.cook_index import cook_index
+from recipes.purge import soft_delete_recipes, soft_delete_users
 from recipes.models import (Ingredient, Tag, Recipe,
                             Favorite, ShoppingList, IngredientInRecipe)
+from stats.models import (AuthorStat, DailyRecipeStat, IngredientStat,
+                          RecipeStat, TagStat)
+from stats.summary import REFRESHED_KEY
 from users.models import Subscribe
-from .pagination import CustomPagination
+from .pagination import CustomPagination, RecipePagination
+from .budgets import query_budget
 from .filters import IngredientFilter, RecipeFilter
+from .idempotency import idempotent
+from .memberships import get_memberships, subscribed_annotation
+from .snapshots import snapshot_response
 from .serializers import (IngredientSerializer, MineUserSerializer,
                           SubscribeSerializer, TagSerializer,
                           RecipeCreateUpdateSerializer,
-                          RecipeListSerializer, RecipeShortSerializer)
+                          RecipeListSerializer, RecipeShortSerializer,
+                          AuthorStatSerializer, DailyRecipeStatSerializer,
+                          IngredientStatSerializer, RecipeStatSerializer,
+                          TagStatSerializer)
 from .permissions import IsAuthorOrAdminPermissoin
+from .throttling import ReadThrottle, ShoppingCartDownloadThrottle
 
 
 User = get_user_model()
 
+MAX_MISSING_INGREDIENTS = 10
+FILTER_CHUNK_SIZE = 1000
+STATS_TOP_SIZE = 20
+STATS_DAYS = 30
+SUBREQUEST_DROPPED_HEADERS = ('HTTP_ACCEPT_ENCODING', 'HTTP_IF_NONE_MATCH',
+                              'HTTP_IF_MODIFIED_SINCE')
+
 
 class CastomUserViewSet(UserViewSet):
     """Viewset для модели юзера"""
-    queryset = User.objects.all()
+    queryset = User.objects.filter(deleted=False)
     serializer_class = MineUserSerializer
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        names, _ = MineUserSerializer.field_selection(self.request)
+        if self.request.method in SAFE_METHODS and 'is_subscribed' in names:
+            queryset = queryset.annotate(
+                is_subscribed=subscribed_annotation(self.request.user))
+        return queryset
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
+    @idempotent
     def subscribe(self, request, **kwargs):
         """Метод для подписки/отписки от автора."""
         user = request.user
         author_id = self.kwargs.get('id')
-        author = get_object_or_404(User, id=author_id)
+        author = get_object_or_404(User, id=author_id, deleted=False)
 
         if request.method == 'POST':
             serializer = SubscribeSerializer(author,
@@ -62,16 +102,27 @@ class CastomUserViewSet(UserViewSet):
         detail=False,
         permission_classes=[IsAuthenticated]
     )
+    @query_budget(statement_timeout=2000)
     def subscriptions(self, request):
         """Метод для просмотра подписок на авторов."""
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        queryset = User.objects.filter(subscribing__user=user, deleted=False)
+        names, _ = SubscribeSerializer.field_selection(request)
+        if 'is_subscribed' in names:
+            queryset = queryset.annotate(
+                is_subscribed=subscribed_annotation(user))
+        if 'recipes_count' in names:
+            queryset = queryset.annotate(recipes_count=Count(
+                'recipes', filter=Q(recipes__deleted=False)))
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(pages,
                                          many=True,
                                          context={'request': request})
         return self.get_paginated_response(serializer.data)
 
+    def perform_destroy(self, instance):
+        soft_delete_users(User.objects.filter(pk=instance.pk))
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     """Viewset для просмотра ингридиентовч"""
@@ -80,25 +131,81 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    @query_budget(statement_timeout=1000)
+    def list(self, request, *args, **kwargs):
+        response = snapshot_response(request, 'ingredients')
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return response
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Viewset для просмотра тега"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        response = snapshot_response(request, 'tags')
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return response
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Viewset для рецептов"""
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,
                           IsAuthorOrAdminPermissoin, )
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """Подгружает только то, что попадёт в выдачу с учётом ?fields=,
+        ?omit= и ?expand=."""
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        names, collapsed = RecipeListSerializer.field_selection(self.request)
+        if 'author' in names and 'author' not in collapsed:
+            queryset = self.with_authors(queryset)
+        if 'tags' in names:
+            queryset = queryset.prefetch_related('tags')
+        if 'ingredients' in names:
+            queryset = queryset.prefetch_related(Prefetch(
+                'ingredientinrecipe_set',
+                queryset=IngredientInRecipe.objects.select_related(
+                    'ingredient')
+            ))
+        if 'text' not in names:
+            queryset = queryset.defer('text')
+        return queryset
+
+    def with_authors(self, queryset):
+        """Авторы рецептов вместе с флагом подписки на них."""
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.select_related('author')
+        return queryset.prefetch_related(Prefetch(
+            'author',
+            queryset=User.objects.annotate(
+                is_subscribed=subscribed_annotation(user))
+        ))
+
+    @query_budget(statement_timeout=2000, max_queries=15, max_rows=5000)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        soft_delete_recipes(Recipe.objects.filter(pk=instance.pk))
+
     def get_serializer_class(self):
         if self.action in ('create', 'partial_update'):
             return RecipeCreateUpdateSerializer
@@ -109,6 +216,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
+    @idempotent
     def favorite(self, request, pk):
         """Метод для добавления/удаления из избранного."""
         if request.method == 'POST':
@@ -121,6 +229,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
         methods=['post', 'delete'],
         permission_classes=[IsAuthenticated]
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         """Метод для добавления/удаления из списка покупок."""
         if request.method == 'POST':
@@ -147,25 +256,196 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response({'errors': 'Рецепт уже удален!'},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True)
+    def similar(self, request, pk):
+        """Похожие рецепты по ингредиентам и тегам."""
+        recipes = Recipe.objects.filter(
+            similar_to__recipe_id=pk).order_by('-similar_to__score')
+        serializer = RecipeShortSerializer(recipes, many=True,
+                                           context={'request': request})
+        if not serializer.data:
+            get_object_or_404(Recipe, pk=pk)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def what_to_cook(self, request):
+        """Рецепты, для которых не хватает не больше max_missing
+        ингредиентов из переданных в ingredients."""
+        # Перестройка индекса читает всю таблицу IngredientInRecipe и
+        # не должна упираться в лимит строк: иначе индекс так и
+        # останется непостроенным, а каждый запрос будет получать 422.
+        cook_index.sync()
+        return self.find_recipes_to_cook(request)
+
+    @query_budget(statement_timeout=2000, max_rows=50000)
+    def find_recipes_to_cook(self, request):
+        try:
+            ingredient_ids = [
+                int(value)
+                for item in request.query_params.getlist('ingredients')
+                for value in item.split(',') if value
+            ]
+            max_missing = min(
+                int(request.query_params.get('max_missing', 2)),
+                MAX_MISSING_INGREDIENTS
+            )
+        except ValueError:
+            return Response({'errors': 'Ожидаются целые числа.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not ingredient_ids:
+            return Response({'errors': 'Укажите ингредиенты.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        recipe_ids, missing = cook_index.search(ingredient_ids, max_missing)
+        allowed = set()
+        for start in range(0, len(recipe_ids), FILTER_CHUNK_SIZE):
+            allowed.update(self.filter_queryset(Recipe.objects.filter(
+                pk__in=recipe_ids[start:start + FILTER_CHUNK_SIZE]
+            )).values_list('pk', flat=True))
+        page = self.paginate_queryset([
+            (recipe_id, count) for recipe_id, count in zip(recipe_ids, missing)
+            if recipe_id in allowed
+        ])
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        page = [(recipes[recipe_id], count) for recipe_id, count in page
+                if recipe_id in recipes]
+        data = self.get_serializer(
+            [recipe for recipe, _ in page], many=True).data
+        for item, (_, count) in zip(data, page):
+            item['missing_ingredients'] = count
+        return self.get_paginated_response(data)
+
+    @staticmethod
+    def shopping_list_lines(buy_list):
+        yield 'Список покупок с сайта Foodgram:\n\n'
+        for item in buy_list:
+            yield (
+                f'{item["ingredient__name"]}, {item["amount"]} '
+                f'{item["ingredient__measurement_unit"]}\n'
+            )
+
     @action(detail=False, methods=('get',),
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            throttle_classes=(ReadThrottle, ShoppingCartDownloadThrottle))
     def download_shopping_cart(self, request):
         """Скачивание списка покупок"""
-        shopping_cart = ShoppingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        buy_list = IngredientInRecipe.objects.filter(
-            recipe__in=recipes).values(
-            'ingredient').annotate(amount=Sum('amount'))
-        buy_list_text = 'Список покупок с сайта Foodgram:\n\n'
-        for item in buy_list:
-            ingredient = Ingredient.objects.get(pk=item['ingredient'])
-            amount = item['amount']
-            buy_list_text += (
-                f'{ingredient.name}, {amount} '
-                f'{ingredient.measurement_unit}\n'
-            )
-        response = HttpResponse(buy_list_text, content_type="text/plain")
+        buy_list = list(IngredientInRecipe.objects.filter(
+            recipe__shopping_list__user=request.user,
+            recipe__deleted=False
+        ).values(
+            'ingredient', 'ingredient__name', 'ingredient__measurement_unit'
+        ).annotate(amount=Sum('amount')).order_by('ingredient__name'))
+        response = StreamingHttpResponse(
+            self.shopping_list_lines(buy_list), content_type='text/plain'
+        )
         response['Content-Disposition'] = (
             'attachment; filename=shopping-list.txt'
         )
         return response
+
+
+class BatchView(APIView):
+    """Несколько GET-запросов к API за один запрос.
+
+    Тело: {"requests": ["/api/tags/", "/api/users/me/", ...]}. Подзапросы
+    выполняются по очереди с уже проверенной аутентификацией и общими
+    наборами избранного, корзины и подписок пользователя.
+    """
+
+    def post(self, request):
+        urls = request.data.get('requests')
+        if not isinstance(urls, list) or not urls:
+            return Response({'errors': 'Передайте список URL в requests.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(urls) > settings.BATCH_MAX_REQUESTS:
+            return Response(
+                {'errors': 'Не больше {} запросов в пакете.'.format(
+                    settings.BATCH_MAX_REQUESTS)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        get_memberships(request)
+        return Response([self.dispatch_get(request, url) for url in urls])
+
+    def dispatch_get(self, request, url):
+        result = {'url': url}
+        parts = urlsplit(url) if isinstance(url, str) else None
+        if parts is None or parts.scheme or parts.netloc or (
+                not parts.path.startswith('/api/')):
+            result.update(status=status.HTTP_400_BAD_REQUEST,
+                          body={'errors': 'Ожидается относительный URL API.'})
+            return result
+        try:
+            match = resolve(parts.path)
+        except Resolver404:
+            match = None
+        view = match and getattr(match.func, 'sync_view', match.func)
+        if view is None or getattr(view, 'view_class', None) is BatchView:
+            result.update(status=status.HTTP_404_NOT_FOUND,
+                          body={'detail': 'Страница не найдена.'})
+            return result
+
+        subrequest = copy.copy(request._request)
+        subrequest.method = 'GET'
+        subrequest.path = subrequest.path_info = parts.path
+        subrequest.GET = QueryDict(parts.query)
+        subrequest.META = {**request.META, 'REQUEST_METHOD': 'GET',
+                           'PATH_INFO': parts.path,
+                           'QUERY_STRING': parts.query}
+        # Тело подответа встраивается в JSON пакета: сжатие и 304 ему
+        # не подходят.
+        for header in SUBREQUEST_DROPPED_HEADERS:
+            subrequest.META.pop(header, None)
+        subrequest.resolver_match = match
+        if request.user.is_authenticated:
+            subrequest._force_auth_user = request.user
+            subrequest._force_auth_token = request.auth
+        response = view(subrequest, *match.args, **match.kwargs)
+        if response.streaming:
+            response.close()
+            result.update(
+                status=status.HTTP_400_BAD_REQUEST,
+                body={'errors': 'Потоковые ответы (например, файлы) '
+                                'нельзя запросить в пакете.'}
+            )
+            return result
+        result['status'] = response.status_code
+        result['body'] = self.response_body(response)
+        return result
+
+    @staticmethod
+    def response_body(response):
+        if hasattr(response, 'data'):
+            return response.data
+        if response.get('Content-Type', '').startswith('application/json'):
+            return orjson.loads(response.content)
+        return response.content.decode(errors='replace')
+
+
+class StatsView(APIView):
+    """Статистика для администраторов.
+
+    Читает сводные таблицы, которые пересчитывает команда refresh_stats,
+    поэтому данные отстают на интервал пересчёта.
+    """
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        since = timezone.localdate() - timedelta(days=STATS_DAYS)
+        return Response({
+            'refreshed_at': cache.get(REFRESHED_KEY),
+            'top_ingredients': IngredientStatSerializer(
+                IngredientStat.objects.select_related(
+                    'ingredient')[:STATS_TOP_SIZE], many=True).data,
+            'tags': TagStatSerializer(
+                TagStat.objects.select_related('tag'), many=True).data,
+            'top_favorited_recipes': RecipeStatSerializer(
+                RecipeStat.objects.select_related(
+                    'recipe')[:STATS_TOP_SIZE], many=True).data,
+            'top_authors': AuthorStatSerializer(
+                AuthorStat.objects.select_related(
+                    'author')[:STATS_TOP_SIZE], many=True).data,
+            'daily_new_recipes': DailyRecipeStatSerializer(
+                DailyRecipeStat.objects.filter(date__gt=since),
+                many=True).data,
+        })
@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from foodgram.warmup import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
+
+warm_up()
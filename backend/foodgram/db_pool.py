@@ -0,0 +1,215 @@
+"""Пул соединений с базой данных внутри процесса.
+
+Django держит соединение на поток и при CONN_MAX_AGE=0 закрывает его в
+конце каждого запроса. ``PooledDatabaseWrapperMixin`` вместо этого
+возвращает соединение в общий для потоков процесса пул, а следующий
+запрос берёт его оттуда. Пул ограничен MAX_SIZE соединениями: когда
+все заняты, поток ждёт до TIMEOUT секунд. Соединение, простоявшее в
+пуле дольше HEALTH_CHECK_AFTER секунд, перед выдачей проверяется
+``SELECT 1``, а соединения старше MAX_LIFETIME закрываются и
+открываются заново.
+
+Параметры задаются в DATABASES[alias]['POOL']. Соединения не
+переживают fork: перед ним свободные соединения закрываются, а
+дочерний процесс начинает с пустого пула.
+"""
+import os
+import threading
+import time
+
+POOL_DEFAULTS = {
+    'MAX_SIZE': 4,
+    'MAX_LIFETIME': 1800,
+    'TIMEOUT': 10,
+    'HEALTH_CHECK_AFTER': 5,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+# Соединения родителя, унаследованные при fork. Их нельзя закрывать в
+# дочернем процессе: это оборвало бы сессию родителя на сервере.
+_inherited = []
+
+
+class PoolTimeoutError(Exception):
+    """Все соединения пула заняты дольше TIMEOUT секунд."""
+
+
+class ConnectionPool:
+    """Ограниченный пул соединений, общий для потоков процесса."""
+
+    def __init__(self, connect, max_size, max_lifetime, timeout,
+                 health_check_after):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        # Свободные соединения: (соединение, время возврата). Берётся
+        # последнее возвращённое, чтобы лишние простаивали и старели.
+        self.idle = []
+        self.opened = {}
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def checkout(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            connection, returned = self.reserve(deadline)
+            if connection is None:
+                return self.open()
+            if self.is_healthy(connection, returned):
+                return connection
+            self.discard(connection)
+
+    def reserve(self, deadline):
+        """Свободное соединение или место под новое, если пул не полон."""
+        with self.condition:
+            while True:
+                while self.idle:
+                    connection, returned = self.idle.pop()
+                    if not self.is_expired(connection):
+                        return connection, returned
+                    self.discard(connection, locked=True)
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None, None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f'Все {self.max_size} соединений заняты.')
+                self.condition.wait(remaining)
+
+    def open(self):
+        try:
+            connection = self.connect()
+        except BaseException:
+            with self.condition:
+                self.size -= 1
+                self.condition.notify()
+            raise
+        self.opened[id(connection)] = time.monotonic()
+        return connection
+
+    def release(self, connection):
+        if id(connection) not in self.opened:
+            # Соединение выдано не этим пулом, например пулом родителя до
+            # fork: место в пуле оно не занимает, а закрытие оборвало бы
+            # чужую сессию.
+            _inherited.append(connection)
+            return
+        if self.is_expired(connection):
+            self.discard(connection)
+            return
+        try:
+            # Незавершённая транзакция не должна достаться другому потоку.
+            connection.rollback()
+        except Exception:
+            self.discard(connection)
+            return
+        with self.condition:
+            self.idle.append((connection, time.monotonic()))
+            self.condition.notify()
+
+    def discard(self, connection, locked=False):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        if locked:
+            self.forget(connection)
+            return
+        with self.condition:
+            self.forget(connection)
+
+    def forget(self, connection):
+        # Место в пуле освобождает только выданное им соединение.
+        if self.opened.pop(id(connection), None) is None:
+            return
+        self.size -= 1
+        self.condition.notify()
+
+    def is_expired(self, connection):
+        opened = self.opened.get(id(connection))
+        if opened is None:
+            return False
+        return time.monotonic() - opened > self.max_lifetime
+
+    def is_healthy(self, connection, returned):
+        if time.monotonic() - returned < self.health_check_after:
+            return True
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        return True
+
+    def close_idle(self):
+        with self.condition:
+            while self.idle:
+                connection, _ = self.idle.pop()
+                self.discard(connection, locked=True)
+
+
+def get_pool(alias, settings_dict, connect):
+    pool = _pools.get(alias)
+    if pool is not None:
+        return pool
+    options = {**POOL_DEFAULTS, **settings_dict.get('POOL', {})}
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = ConnectionPool(
+                connect,
+                max_size=int(options['MAX_SIZE']),
+                max_lifetime=float(options['MAX_LIFETIME']),
+                timeout=float(options['TIMEOUT']),
+                health_check_after=float(options['HEALTH_CHECK_AFTER']),
+            )
+        return _pools[alias]
+
+
+def close_idle_connections():
+    for pool in list(_pools.values()):
+        pool.close_idle()
+
+
+def reset_after_fork():
+    global _pools_lock
+    _inherited.append(dict(_pools))
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+os.register_at_fork(before=close_idle_connections,
+                    after_in_child=reset_after_fork)
+
+
+class PooledDatabaseWrapperMixin:
+    """Берёт соединения из пула и возвращает их туда вместо закрытия."""
+
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict, self.open_connection)
+
+    def open_connection(self):
+        return super().get_new_connection(self.get_connection_params())
+
+    def get_new_connection(self, conn_params):
+        try:
+            return self.pool.checkout()
+        except PoolTimeoutError as error:
+            raise self.Database.OperationalError(str(error)) from error
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.in_atomic_block:
+            # Обёртка оставит соединение у себя до конца atomic, поэтому
+            # отдавать его другому потоку нельзя.
+            self.pool.discard(self.connection)
+            return
+        self.pool.release(self.connection)
@@ -0,0 +1,107 @@
+"""Маршрутизация чтения на реплики базы данных.
+
+Безопасные запросы (GET, HEAD, OPTIONS) читают с реплик по кругу.
+Реплика, к которой не удалось подключиться, исключается на время
+``REPLICA_HEALTH_RETRY_SECONDS``. После первой записи в запросе все
+чтения идут в основную базу, а клиент получает отметку (cookie и
+заголовок) со временем записи, которая держит его на основной базе ещё
+``REPLICA_PIN_SECONDS`` секунд.
+"""
+import itertools
+import threading
+import time
+
+from asgiref.local import Local
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'primary_pin'
+PIN_HEADER = 'X-Primary-Pin'
+
+_state = Local()
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES
+            if alias != DEFAULT_DB_ALIAS]
+
+
+def start_request(use_replica):
+    """Включает чтение с реплик для текущего запроса."""
+    _state.use_replica = use_replica
+    _state.wrote = False
+
+
+def finish_request():
+    """Возвращает True, если в ходе запроса была запись."""
+    wrote = getattr(_state, 'wrote', False)
+    _state.use_replica = False
+    _state.wrote = False
+    return wrote
+
+
+def pin_stamp():
+    """Значение отметки для cookie и заголовка: время записи."""
+    return f'{time.time():.3f}'
+
+
+def is_pinned(stamp):
+    """True, если отметка свежее REPLICA_PIN_SECONDS."""
+    try:
+        written = float(stamp)
+    except (TypeError, ValueError):
+        return False
+    return 0 <= time.time() - written < settings.REPLICA_PIN_SECONDS
+
+
+def pin_to_primary():
+    """Направляет все последующие чтения запроса в основную базу."""
+    _state.wrote = True
+
+
+class PrimaryReplicaRouter:
+    """Роутер: запись в default, чтение с реплик по кругу."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._aliases = replica_aliases()
+        self._cycle = itertools.cycle(self._aliases)
+        self._down_until = {}
+
+    def _is_healthy(self, alias):
+        if self._down_until.get(alias, 0) > time.monotonic():
+            return False
+        try:
+            connections[alias].ensure_connection()
+        except DatabaseError:
+            self._down_until[alias] = (
+                time.monotonic() + settings.REPLICA_HEALTH_RETRY_SECONDS
+            )
+            return False
+        return True
+
+    def _next_replica(self):
+        for _ in range(len(self._aliases)):
+            with self._lock:
+                alias = next(self._cycle)
+            if self._is_healthy(alias):
+                return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_read(self, model, **hints):
+        if (not self._aliases
+                or not getattr(_state, 'use_replica', False)
+                or getattr(_state, 'wrote', False)
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return self._next_replica()
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
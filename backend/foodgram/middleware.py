@@ -0,0 +1,65 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .db_router import (PIN_COOKIE, PIN_HEADER, finish_request,
+                        is_pinned, pin_stamp, replica_aliases,
+                        start_request)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware:
+    """Включает чтение с реплик для безопасных запросов.
+
+    Клиент, недавно что-то записавший, читает из основной базы, пока
+    отметка из cookie или заголовка ``X-Primary-Pin`` (время записи) не
+    станет старше REPLICA_PIN_SECONDS. Под ASGI работает асинхронно:
+    состояние запроса хранится в asgiref.local.Local и видно потокам,
+    в которых выполняются представления.
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = finish_request()
+        return self.finish(response, wrote)
+
+    async def __acall__(self, request):
+        self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = finish_request()
+        return self.finish(response, wrote)
+
+    @staticmethod
+    def start(request):
+        pinned = (is_pinned(request.COOKIES.get(PIN_COOKIE))
+                  or is_pinned(request.headers.get(PIN_HEADER)))
+        start_request(request.method in SAFE_METHODS and not pinned)
+
+    @staticmethod
+    def finish(response, wrote):
+        if wrote:
+            stamp = pin_stamp()
+            response.set_cookie(
+                PIN_COOKIE, stamp,
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+            response[PIN_HEADER] = stamp
+        return response
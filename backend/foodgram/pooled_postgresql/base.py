@@ -0,0 +1,8 @@
+"""PostgreSQL с пулом соединений: DB_ENGINE=foodgram.pooled_postgresql."""
+from django.db.backends.postgresql import base
+
+from foodgram.db_pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
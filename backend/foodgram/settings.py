@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -35,12 +36,16 @@ INSTALLED_APPS = [
     'django_filters',
 
     'api',
+    'jobs',
     'recipes',
+    'stats',
     'users',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.static.StaticFilesMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,7 +85,47 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        # Для DB_ENGINE=foodgram.pooled_postgresql: пул соединений на
+        # процесс. Размер по умолчанию задан ниже, после числа потоков.
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 0)),
+            'MAX_LIFETIME': int(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+            'TIMEOUT': int(os.getenv('DB_POOL_TIMEOUT', 10)),
+            'HEALTH_CHECK_AFTER': int(
+                os.getenv('DB_POOL_HEALTH_CHECK_AFTER', 5)),
+        },
+    }
+}
+
+# Реплики только для чтения: DB_REPLICA_HOSTS=replica1,replica2
+for number, host in enumerate(
+        filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_router.PrimaryReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+REPLICA_HEALTH_RETRY_SECONDS = int(
+    os.getenv('REPLICA_HEALTH_RETRY_SECONDS', 30))
+
+# Общий для всех процессов кеш. По умолчанию файловый, чтобы воркеры
+# gunicorn в одном контейнере видели одни и те же данные.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
     }
 }
 
@@ -124,10 +169,20 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+STATICFILES_STORAGE = 'foodgram.static.CompressedManifestStaticFilesStorage'
+
+# Отдавать статику из приложения, когда перед ним нет nginx.
+SERVE_STATIC = os.getenv('SERVE_STATIC', 'False') == 'True'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.getenv('RECIPE_IMAGE_MAX_BYTES', 5 * 1024 * 1024))
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -140,8 +195,57 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.ORJSONParser',
+        'api.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.ReadThrottle',
+        'api.throttling.WriteThrottle',
+    ],
+    'DEFAULT_THROTTLE_RATES': {
+        'anon_read': os.getenv('THROTTLE_ANON_READ', '120/min'),
+        'user_read': os.getenv('THROTTLE_USER_READ', '600/min'),
+        'write': os.getenv('THROTTLE_WRITE', '60/min'),
+        'shopping_cart_download': '10/min',
+    },
 }
 
+BATCH_MAX_REQUESTS = 10
+
+# Сколько секунд хранится ответ на запрос с заголовком Idempotency-Key.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
+# Прогрев воркера при загрузке wsgi.py/asgi.py.
+WARM_UP_ON_START = os.getenv('WARM_UP_ON_START', 'True') == 'True'
+
+# Очередь отложенных задач: 0 потоков - задачи выполняет только run_jobs.
+JOB_WORKER_THREADS = int(os.getenv('JOB_WORKER_THREADS', 2))
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_DELAY = 10
+JOB_LEASE_SECONDS = 300
+
+# Асинхронные варианты частых GET-запросов; asgi.py включает их сам.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 8))
+
+# Пул по умолчанию вмещает все потоки процесса, которые работают с
+# базой: потоки gunicorn, очереди задач и асинхронных представлений.
+# Иначе потоки запросов ждут DB_POOL_TIMEOUT и получают OperationalError,
+# пока соединения заняты задачами.
+if not DATABASES['default']['POOL']['MAX_SIZE']:
+    DATABASES['default']['POOL']['MAX_SIZE'] = (
+        int(os.getenv('GUNICORN_THREADS', 1)) + JOB_WORKER_THREADS
+        + (ASYNC_DB_THREADS if ASYNC_VIEWS else 0)
+    )
+
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {
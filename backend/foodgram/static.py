@@ -0,0 +1,196 @@
+"""Статика с хешами в именах и заранее сжатыми копиями.
+
+``CompressedManifestStaticFilesStorage`` при ``collectstatic`` пишет
+файлы с хешем содержимого в имени и рядом с текстовыми файлами кладёт
+``.gz`` и ``.br``. ``StaticFilesMiddleware`` (SERVE_STATIC=True) отдаёт
+эту статику без nginx: выбирает сжатую копию по Accept-Encoding, а
+файлы с хешем в имени отдаёт с Cache-Control immutable на год.
+"""
+import gzip
+import io
+import mimetypes
+import os
+from email.utils import formatdate
+
+import brotli
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import (ManifestStaticFilesStorage,
+                                                staticfiles_storage)
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponseNotModified
+
+COMPRESSIBLE_EXTENSIONS = {
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ico', '.eot', '.ttf', '.otf',
+}
+# Сжатая копия сохраняется, только если она заметно меньше исходника.
+MIN_COMPRESSION_RATIO = 0.95
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+
+def gzip_compress(data):
+    # gzip.compress без mtime=0 (Python 3.8+) делает сжатые копии
+    # разными при каждом collectstatic.
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9,
+                       mtime=0) as archive:
+        archive.write(data)
+    return buffer.getvalue()
+
+
+COMPRESSORS = {
+    '.gz': gzip_compress,
+    '.br': lambda data: brotli.compress(data, quality=11),
+}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который сжимает файлы с хешем."""
+    # Без собранной статики админка должна открываться, а не падать.
+    manifest_strict = False
+
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in hashed_names.values():
+            extension = os.path.splitext(hashed_name)[1].lower()
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                self.compress(hashed_name)
+
+    def compress(self, name):
+        """Пишет .gz и .br рядом с файлом, если их ещё нет.
+
+        Имя содержит хеш содержимого, поэтому существующая сжатая
+        копия уже соответствует файлу.
+        """
+        data = None
+        for suffix, compressor in COMPRESSORS.items():
+            if self.exists(name + suffix):
+                continue
+            if data is None:
+                with self.open(name) as original:
+                    data = original.read()
+            compressed = compressor(data)
+            if len(compressed) < len(data) * MIN_COMPRESSION_RATIO:
+                self._save(name + suffix, ContentFile(compressed))
+
+
+class StaticFile:
+    """Файл статики и его сжатые копии с готовыми заголовками."""
+
+    def __init__(self, path, immutable):
+        self.path = path
+        stat = os.stat(path)
+        self.content_type = (mimetypes.guess_type(path)[0]
+                             or 'application/octet-stream')
+        self.version = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        self.last_modified = formatdate(stat.st_mtime, usegmt=True)
+        self.cache_control = IMMUTABLE if immutable else REVALIDATE
+        self.variants = [
+            (encoding, path + suffix) for encoding, suffix in ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+
+    def etag(self, encoding):
+        if encoding:
+            return f'"{self.version}-{encoding}"'
+        return f'"{self.version}"'
+
+    def choose(self, accept_encoding):
+        accepted = accepted_encodings(accept_encoding)
+        for encoding, path in self.variants:
+            if encoding in accepted:
+                return encoding, path
+        return None, self.path
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for item in header.split(','):
+        encoding, _, params = item.strip().partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q=') and params[2:].strip('0.') == '':
+            continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+def collect_static_files(root, url):
+    """Словарь путь URL -> StaticFile для всего STATIC_ROOT."""
+    hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[url + name] = StaticFile(path, name in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """Отдаёт STATIC_ROOT без nginx, если SERVE_STATIC=True.
+
+    Список файлов читается при запуске воркера, поэтому после
+    collectstatic воркеры нужно перезапустить. Под ASGI работает
+    асинхронно и не переводит цепочку middleware в один поток.
+    """
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVE_STATIC:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.files = collect_static_files(settings.STATIC_ROOT,
+                                          settings.STATIC_URL)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        static_file = self.find(request)
+        if static_file is None:
+            return self.get_response(request)
+        return self.serve(request, static_file)
+
+    async def __acall__(self, request):
+        static_file = self.find(request)
+        if static_file is None:
+            return await self.get_response(request)
+        return self.serve(request, static_file)
+
+    def find(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return self.files.get(request.path_info)
+
+    def serve(self, request, static_file):
+        encoding, path = static_file.choose(
+            request.headers.get('Accept-Encoding', ''))
+        etag = static_file.etag(encoding)
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'))
+            response['Content-Type'] = static_file.content_type
+            del response['Content-Disposition']
+            if encoding:
+                response['Content-Encoding'] = encoding
+            response['Last-Modified'] = static_file.last_modified
+        response['ETag'] = etag
+        response['Cache-Control'] = static_file.cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from foodgram import db_pool
+from foodgram.db_pool import ConnectionPool, PoolTimeoutError
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.pool = ConnectionPool(mock.Mock, max_size=2, max_lifetime=60,
+                                   timeout=0, health_check_after=60)
+
+    def assert_bound_holds(self):
+        connections = [self.pool.checkout() for _ in range(2)]
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.checkout()
+        for connection in connections:
+            self.pool.release(connection)
+
+    def test_unknown_connection_is_not_expired(self):
+        self.assertFalse(self.pool.is_expired(mock.Mock()))
+
+    def test_discarding_unknown_connection_keeps_size(self):
+        unknown = mock.Mock()
+        self.pool.discard(unknown)
+        unknown.close.assert_called_once_with()
+        self.assertEqual(self.pool.size, 0)
+        self.assert_bound_holds()
+
+    def test_releasing_unknown_connection_leaves_it_open(self):
+        unknown = mock.Mock()
+        with mock.patch.object(db_pool, '_inherited', []):
+            self.pool.release(unknown)
+        unknown.close.assert_not_called()
+        self.assertEqual(self.pool.size, 0)
+        self.assertEqual(self.pool.idle, [])
+        self.assert_bound_holds()
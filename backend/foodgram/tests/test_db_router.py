@@ -0,0 +1,153 @@
+import asyncio
+import os
+import tempfile
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.db.utils import ConnectionHandler
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from foodgram import db_router
+from foodgram.db_router import (PIN_COOKIE, PIN_HEADER, PrimaryReplicaRouter,
+                                finish_request, start_request)
+from foodgram.middleware import ReplicaRoutingMiddleware
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+def sqlite(name):
+    return {'ENGINE': 'django.db.backends.sqlite3', 'NAME': name}
+
+
+@override_settings(REPLICA_PIN_SECONDS=5, REPLICA_HEALTH_RETRY_SECONDS=30)
+class RouterTestCase(SimpleTestCase):
+    """Роутер на отдельном наборе соединений с файлами SQLite."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.connections = ConnectionHandler({
+            alias: sqlite(os.path.join(self.directory, f'{alias}.db'))
+            for alias in ['default', *REPLICAS]
+        })
+        self.addCleanup(self.connections.close_all)
+        for target, value in (('connections', self.connections),
+                              ('replica_aliases', lambda: REPLICAS)):
+            patcher = mock.patch.object(db_router, target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(finish_request)
+
+    def take_down(self, alias):
+        """Реплика в несуществующем каталоге: подключиться к ней нельзя."""
+        self.connections[alias].settings_dict['NAME'] = os.path.join(
+            self.directory, 'missing', f'{alias}.db')
+
+    def reads(self, router, count):
+        return [router.db_for_read(None) for _ in range(count)]
+
+
+class PrimaryReplicaRouterTest(RouterTestCase):
+
+    def test_reads_go_round_robin_over_replicas(self):
+        router = PrimaryReplicaRouter()
+        start_request(True)
+        self.assertEqual(self.reads(router, 4), REPLICAS * 2)
+
+    def test_unsafe_request_reads_from_primary(self):
+        router = PrimaryReplicaRouter()
+        start_request(False)
+        self.assertEqual(self.reads(router, 2), ['default'] * 2)
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.take_down('replica_2')
+        router = PrimaryReplicaRouter()
+        start_request(True)
+        self.assertEqual(self.reads(router, 3), ['replica_1'] * 3)
+        self.assertIn('replica_2', router._down_until)
+
+    def test_primary_when_no_replica_is_healthy(self):
+        for alias in REPLICAS:
+            self.take_down(alias)
+        router = PrimaryReplicaRouter()
+        start_request(True)
+        self.assertEqual(router.db_for_read(None), 'default')
+
+    def test_write_pins_request_to_primary(self):
+        router = PrimaryReplicaRouter()
+        start_request(True)
+        self.assertEqual(router.db_for_read(None), 'replica_1')
+        self.assertEqual(router.db_for_write(None), 'default')
+        self.assertEqual(self.reads(router, 2), ['default'] * 2)
+        self.assertIs(finish_request(), True)
+
+
+class ReplicaRoutingMiddlewareTest(RouterTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('foodgram.middleware.replica_aliases',
+                             lambda: REPLICAS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def view(self, request, write=False):
+        response = HttpResponse()
+        response.read_from = self.router.db_for_read(None)
+        if write:
+            self.router.db_for_write(None)
+        return response
+
+    def handle(self, request, write=False):
+        return ReplicaRoutingMiddleware(
+            lambda request: self.view(request, write))(request)
+
+    def test_write_sets_timestamped_pin(self):
+        before = time.time()
+        response = self.handle(self.factory.post('/api/recipes/'), write=True)
+        stamp = float(response[PIN_HEADER])
+        # Метка округлена до миллисекунд.
+        self.assertAlmostEqual(stamp, before, delta=1)
+        self.assertEqual(float(response.cookies[PIN_COOKIE].value), stamp)
+
+    def test_fresh_cookie_pins_to_primary(self):
+        request = self.factory.get('/api/recipes/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(self.handle(request).read_from, 'default')
+
+    def test_expired_cookie_reads_from_replica(self):
+        request = self.factory.get('/api/recipes/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 6)
+        self.assertEqual(self.handle(request).read_from, 'replica_1')
+
+    def test_header_pin_expires(self):
+        fresh = self.factory.get('/api/recipes/', **{
+            'HTTP_X_PRIMARY_PIN': str(time.time())})
+        self.assertEqual(self.handle(fresh).read_from, 'default')
+        stale = self.factory.get('/api/recipes/', **{
+            'HTTP_X_PRIMARY_PIN': str(time.time() - 6)})
+        self.assertEqual(self.handle(stale).read_from, 'replica_1')
+
+    def test_header_without_timestamp_does_not_pin(self):
+        request = self.factory.get('/api/recipes/', HTTP_X_PRIMARY_PIN='1')
+        self.assertEqual(self.handle(request).read_from, 'replica_1')
+
+    def test_async_chain_runs_view_in_other_thread(self):
+        # Как async_view: представление выполняется в пуле потоков.
+        async def view(request):
+            return await sync_to_async(self.view, thread_sensitive=False)(
+                request, request.method == 'POST')
+
+        middleware = ReplicaRoutingMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        read = async_to_sync(middleware)(self.factory.get('/api/recipes/'))
+        self.assertEqual(read.read_from, 'replica_1')
+        self.assertNotIn(PIN_HEADER, read)
+        write = async_to_sync(middleware)(self.factory.post('/api/recipes/'))
+        self.assertEqual(write.read_from, 'default')
+        self.assertIn(PIN_HEADER, write)
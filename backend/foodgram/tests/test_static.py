@@ -0,0 +1,48 @@
+import asyncio
+import os
+import tempfile
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from foodgram.static import StaticFilesMiddleware
+
+
+class StaticFilesMiddlewareTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, 'app.js'), 'w') as file:
+            file.write('console.log(1);')
+        settings = override_settings(SERVE_STATIC=True,
+                                     STATIC_ROOT=directory.name,
+                                     STATIC_URL='/static/')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.factory = RequestFactory()
+
+    def assert_served(self, response):
+        self.assertIn('javascript', response['Content-Type'])
+        self.assertEqual(b''.join(response.streaming_content),
+                         b'console.log(1);')
+        response.close()
+
+    def test_sync_chain(self):
+        middleware = StaticFilesMiddleware(lambda request: HttpResponse())
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        self.assert_served(middleware(self.factory.get('/static/app.js')))
+        self.assertEqual(
+            middleware(self.factory.get('/api/')).content, b'')
+
+    def test_async_chain(self):
+        async def view(request):
+            return HttpResponse(b'view')
+
+        middleware = StaticFilesMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        self.assert_served(async_to_sync(middleware)(
+            self.factory.get('/static/app.js')))
+        self.assertEqual(async_to_sync(middleware)(
+            self.factory.get('/api/')).content, b'view')
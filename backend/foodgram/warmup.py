@@ -0,0 +1,95 @@
+"""Прогрев воркера до первого запроса.
+
+Вызывается из wsgi.py и asgi.py. Под gunicorn с --preload прогрев идёт
+один раз в мастер-процессе, и воркеры получают готовое состояние через
+copy-on-write. Без --preload каждый воркер прогревается при загрузке
+приложения.
+"""
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import NoReverseMatch, Resolver404, resolve, reverse
+
+logger = logging.getLogger(__name__)
+
+WARM_UP_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/1/',
+    '/api/tags/',
+    '/api/ingredients/',
+    '/api/users/',
+    '/api/users/me/',
+    '/api/users/subscriptions/',
+)
+WARM_UP_ROUTES = (
+    'api:recipes-list',
+    'api:tags-list',
+    'api:ingredients-list',
+    'api:users-list',
+)
+
+
+def resolve_routes():
+    """Заполняет кеши URL-резолвера для прямого и обратного поиска."""
+    for path in WARM_UP_PATHS:
+        try:
+            resolve(path)
+        except Resolver404:
+            pass
+    for name in WARM_UP_ROUTES:
+        try:
+            reverse(name)
+        except NoReverseMatch:
+            pass
+
+
+def build_serializers():
+    """Импортирует классы из настроек DRF и строит поля сериализаторов."""
+    from rest_framework.settings import api_settings
+
+    from api import serializers
+
+    for name in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES',
+                 'DEFAULT_AUTHENTICATION_CLASSES',
+                 'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES',
+                 'DEFAULT_CONTENT_NEGOTIATION_CLASS'):
+        getattr(api_settings, name)
+    for serializer in (serializers.RecipeListSerializer,
+                       serializers.RecipeCreateUpdateSerializer,
+                       serializers.RecipeShortSerializer,
+                       serializers.SubscribeSerializer,
+                       serializers.MineUserSerializer,
+                       serializers.TagSerializer,
+                       serializers.IngredientSerializer):
+        serializer().fields
+
+
+def load_data():
+    """Загружает теги, индекс ингредиентов и готовые ответы каталогов в
+    память процесса."""
+    from api.snapshots import CATALOGUES, get_snapshot
+    from recipes.cook_index import cook_index
+    from recipes.models import Tag
+
+    Tag.objects.ids_by_slug()
+    cook_index.sync()
+    for name in CATALOGUES:
+        get_snapshot(name)
+
+
+def warm_up():
+    if not settings.WARM_UP_ON_START:
+        return
+    for step in (resolve_routes, build_serializers, load_data):
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception('Прогрев: шаг %s не выполнен', step.__name__)
+        else:
+            logger.info('Прогрев: %s за %.0f мс', step.__name__,
+                        (time.perf_counter() - started) * 1000)
+    # С --preload открытые соединения унаследовали бы все воркеры сразу.
+    connections.close_all()
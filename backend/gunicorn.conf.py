@@ -0,0 +1,21 @@
+"""Настройки gunicorn, читаются из рабочего каталога автоматически."""
+import os
+
+# С GUNICORN_PRELOAD=True приложение загружается и прогревается один раз
+# в мастер-процессе, а воркеры делят его память через copy-on-write.
+preload_app = os.getenv('GUNICORN_PRELOAD', 'False') == 'True'
+
+workers = int(os.getenv('GUNICORN_WORKERS', 1))
+# При GUNICORN_THREADS больше 1 воркеры gthread обслуживают запросы в
+# потоках: пока один поток ждёт базу, другие отвечают. Соединения с
+# базой тогда стоит брать из пула (DB_ENGINE=foodgram.pooled_postgresql)
+# размером не меньше числа потоков.
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+# Keep-alive учитывают только воркеры gthread.
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# Перезапуск воркера после стольких запросов ограничивает рост памяти,
+# разброс не даёт всем воркерам перезапуститься одновременно.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from jobs.models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+
+    list_display = ['pk', 'name', 'run_at', 'attempts', 'failed']
+    list_filter = ['failed', 'name']
+    readonly_fields = ['created']
+    show_full_result_count = False
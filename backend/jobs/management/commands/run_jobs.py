@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.queue import run_due
+
+
+class Command(BaseCommand):
+    """Обработчик очереди отложенных задач для отдельного узла."""
+    help = 'Выполняет задачи из очереди по мере наступления их срока.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Пауза в секундах, когда очередь пуста.')
+        parser.add_argument('--batch', type=int, default=50)
+        parser.add_argument('--once', action='store_true',
+                            help='Выйти, когда готовых задач не останется.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            close_old_connections()
+            done = run_due(options['batch'])
+            total += done
+            if done:
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(f'Выполнено задач: {total}')
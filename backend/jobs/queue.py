@@ -0,0 +1,154 @@
+"""Очередь отложенных задач без внешнего брокера.
+
+Задача регистрируется декоратором ``task`` в модуле ``tasks`` приложения
+и ставится в очередь функцией ``enqueue``. Строка задачи создаётся в
+текущей транзакции, а после её фиксации задача уходит в пул потоков
+процесса. Повторы с нарастающей задержкой и задачи, оставшиеся после
+перезапуска, подбирает следующий проход или ``manage.py run_jobs``.
+"""
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+SWEEP_LIMIT = 10
+BATCH_LIMIT = 100
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class Task:
+    def __init__(self, func, max_attempts, batch):
+        self.func = func
+        self.max_attempts = max_attempts
+        self.batch = batch
+
+
+def task(name, max_attempts=None, batch=False):
+    """Регистрирует функцию как задачу с именем name.
+
+    Пакетная задача получает список аргументов всех готовых задач с
+    этим именем и выполняет их за один вызов.
+    """
+    def decorator(func):
+        TASKS[name] = Task(
+            func, max_attempts or settings.JOB_MAX_ATTEMPTS, batch)
+        return func
+    return decorator
+
+
+def enqueue(name, **payload):
+    """Ставит задачу в очередь; выполнится после фиксации транзакции."""
+    if name not in TASKS:
+        raise ValueError(f'Неизвестная задача {name}')
+    job = Job.objects.create(name=name, payload=payload)
+    if settings.JOB_WORKER_THREADS:
+        transaction.on_commit(lambda: _submit(job.pk))
+    return job
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.JOB_WORKER_THREADS,
+                thread_name_prefix='jobs'
+            )
+    return _executor
+
+
+def _submit(pk):
+    _get_executor().submit(_run_in_thread, pk)
+
+
+def _run_in_thread(pk):
+    try:
+        job = _due().filter(pk=pk).first()
+        if job is not None:
+            run_job(job)
+        run_due(SWEEP_LIMIT)
+    except Exception:
+        logger.exception('Ошибка очереди задач')
+    finally:
+        connections.close_all()
+
+
+def _due():
+    return Job.objects.filter(failed=False, run_at__lte=timezone.now())
+
+
+def _claim(job):
+    """Берёт задачу в работу на время аренды.
+
+    Условие на число попыток не даёт двум потокам или процессам взять
+    одну и ту же задачу. Если процесс упадёт, задача снова станет
+    доступна, когда аренда истечёт.
+    """
+    lease = timezone.now() + timedelta(seconds=settings.JOB_LEASE_SECONDS)
+    claimed = Job.objects.filter(
+        pk=job.pk, attempts=job.attempts, failed=False
+    ).update(run_at=lease, attempts=F('attempts') + 1)
+    job.attempts += 1
+    return bool(claimed)
+
+
+def _retry(job, max_attempts, error):
+    if job.attempts >= max_attempts:
+        Job.objects.filter(pk=job.pk).update(failed=True, last_error=error)
+        return
+    delay = settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+    Job.objects.filter(pk=job.pk).update(
+        run_at=timezone.now() + timedelta(seconds=delay), last_error=error)
+    if _executor is not None:
+        timer = threading.Timer(delay, _submit, [job.pk])
+        timer.daemon = True
+        timer.start()
+
+
+def run_job(job):
+    """Выполняет задачу и возвращает число обработанных строк очереди."""
+    registered = TASKS.get(job.name)
+    jobs = [job]
+    if registered is not None and registered.batch:
+        jobs += _due().filter(name=job.name).exclude(pk=job.pk)[:BATCH_LIMIT]
+    jobs = [item for item in jobs if _claim(item)]
+    if not jobs:
+        return 0
+    try:
+        if registered is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        if registered.batch:
+            registered.func([item.payload for item in jobs])
+        else:
+            registered.func(**job.payload)
+    except Exception:
+        logger.exception('Задача %s не выполнена', job.name)
+        error = traceback.format_exc()
+        max_attempts = (registered.max_attempts if registered
+                        else settings.JOB_MAX_ATTEMPTS)
+        for item in jobs:
+            _retry(item, max_attempts, error)
+    else:
+        Job.objects.filter(pk__in=[item.pk for item in jobs]).delete()
+    return len(jobs)
+
+
+def run_due(limit):
+    """Выполняет до limit задач, срок которых наступил."""
+    done = 0
+    for job in list(_due()[:limit]):
+        done += run_job(job)
+    return done
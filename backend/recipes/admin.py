@@ -1,13 +1,16 @@
 from django.contrib import admin
+from django.db.models import Count
 
 from recipes.models import (Tag, TagRecipe, Ingredient, IngredientInRecipe,
                             Recipe, Favorite, ShoppingList)
+from recipes.purge import soft_delete_recipes
 
 
 class RecipeIngredientsInline(admin.TabularInline):
 
     model = IngredientInRecipe
     extra = 1
+    autocomplete_fields = ['ingredient']
 
 
 class RecipeTagInLine(admin.TabularInline):
@@ -20,12 +23,35 @@ class RecipeTagInLine(admin.TabularInline):
 class RecipeAdmin(admin.ModelAdmin):
 
     list_display = [
-        'pk', 'name', 'author', 'text', 'cooking_time']
-    search_fields = ['name', 'author', 'cooking_time', 'text']
-    list_filter = ['name', 'author', 'tags']
+        'pk', 'name', 'author', 'cooking_time', 'favorites_count']
+    list_select_related = ['author']
+    search_fields = ['name', 'author__username', 'author__email']
+    list_filter = ['tags']
+    autocomplete_fields = ['author']
     empty_value_display = '-empty-'
+    show_full_result_count = False
     inlines = [RecipeIngredientsInline, RecipeTagInLine]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=Count('favorites', distinct=True)
+        )
+
+    @admin.display(description='В избранном',
+                   ordering='favorites_count')
+    def favorites_count(self, obj):
+        return obj.favorites_count
+
+    def get_deleted_objects(self, objs, request):
+        # Связанные строки удалит purge_deleted, перечислять их не нужно.
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        soft_delete_recipes(Recipe.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_recipes(queryset)
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -38,29 +64,36 @@ class TagAdmin(admin.ModelAdmin):
 class IngredientAdmin(admin.ModelAdmin):
 
     list_display = ['pk', 'name', 'measurement_unit']
-    search_fields = ['name', 'measurement_unit']
-    list_filter = ['name', 'measurement_unit']
+    search_fields = ['name']
+    list_filter = ['measurement_unit']
+    ordering = ['name']
 
 
 @admin.register(IngredientInRecipe)
 class IngredientInRecipeAdmin(admin.ModelAdmin):
 
     list_display = ['pk', 'recipe', 'ingredient', 'amount']
-    search_fields = ['recipe', 'ingredient']
-    list_filter = ['recipe', 'ingredient']
+    list_select_related = ['recipe', 'ingredient']
+    search_fields = ['recipe__name', 'ingredient__name']
+    autocomplete_fields = ['recipe', 'ingredient']
+    show_full_result_count = False
 
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
 
     list_display = ['pk', 'user', 'recipe']
-    search_fields = ['user', 'recipe']
-    list_filter = ['user', 'recipe']
+    list_select_related = ['user', 'recipe']
+    search_fields = ['user__username', 'user__email', 'recipe__name']
+    autocomplete_fields = ['user', 'recipe']
+    show_full_result_count = False
 
 
 @admin.register(ShoppingList)
 class ShoppingCartAdmin(admin.ModelAdmin):
 
     list_display = ['pk', 'user', 'recipe']
-    search_fields = ['user', 'recipe']
-    list_filter = ['user', 'recipe']
+    list_select_related = ['user', 'recipe']
+    search_fields = ['user__username', 'user__email', 'recipe__name']
+    autocomplete_fields = ['user', 'recipe']
+    show_full_result_count = False
@@ -0,0 +1,194 @@
+"""Обратный индекс «ингредиент → рецепты» для подбора по холодильнику.
+
+Для каждого ингредиента хранится отсортированный массив id рецептов,
+а для каждого рецепта - число его ингредиентов. Индекс строится в
+памяти процесса при первом обращении. Изменения рецептов передаются
+между процессами через таблицу CookIndexChange: номер версии - id
+строки из последовательности базы, поэтому одновременные записи не
+получают один номер, как при get+set в файловом кеше. Все изменения
+одной транзакции записываются одной версией. Индекс читает только
+основную базу, чтобы версия и состав не пришли с разных реплик.
+"""
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .models import CookIndexChange, IngredientInRecipe
+
+MAX_DELTAS = 100
+LOAD_CHUNK_SIZE = 10000
+
+_paused = threading.local()
+
+
+def _load_pairs(recipe_ids=None):
+    """Уникальные пары (ингредиент, рецепт), упорядоченные по ним."""
+    queryset = IngredientInRecipe.objects.using(DEFAULT_DB_ALIAS).order_by()
+    if recipe_ids is not None:
+        queryset = queryset.filter(recipe_id__in=recipe_ids)
+    chunks, chunk = [], []
+    pairs = queryset.values_list('ingredient_id', 'recipe_id')
+    for pair in pairs.iterator(chunk_size=LOAD_CHUNK_SIZE):
+        chunk.append(pair)
+        if len(chunk) == LOAD_CHUNK_SIZE:
+            chunks.append(np.array(chunk, dtype=np.int64))
+            chunk = []
+    chunks.append(np.array(chunk, dtype=np.int64).reshape(-1, 2))
+    return np.unique(np.concatenate(chunks), axis=0)
+
+
+class CookIndex:
+    """Поиск рецептов, для которых не хватает не больше K ингредиентов."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = -1
+        # Постинги, id рецептов и число их ингредиентов заменяются
+        # одним присваиванием, чтобы поиск без блокировки видел
+        # согласованный снимок.
+        self._state = ({}, np.empty(0, dtype=np.int64),
+                       np.empty(0, dtype=np.int64))
+
+    def _rebuild(self):
+        pairs = _load_pairs()
+        boundaries = np.flatnonzero(np.diff(pairs[:, 0])) + 1
+        postings = {}
+        for group in np.split(pairs, boundaries):
+            if len(group):
+                postings[int(group[0, 0])] = group[:, 1].copy()
+        self._state = (postings, *np.unique(pairs[:, 1], return_counts=True))
+
+    def _apply(self, changed_ids):
+        changed = np.unique(np.array(list(changed_ids), dtype=np.int64))
+        postings, recipe_ids, sizes = self._state
+        postings = dict(postings)
+        for ingredient_id, posting in list(postings.items()):
+            positions = np.searchsorted(posting, changed)
+            found = positions < len(posting)
+            found[found] = posting[positions[found]] == changed[found]
+            if found.any():
+                postings[ingredient_id] = np.delete(posting, positions[found])
+        keep = ~np.isin(recipe_ids, changed)
+        recipe_ids, sizes = recipe_ids[keep], sizes[keep]
+
+        pairs = _load_pairs(changed.tolist())
+        for ingredient_id, recipe_id in pairs.tolist():
+            posting = postings.get(ingredient_id, np.empty(0, np.int64))
+            postings[ingredient_id] = np.insert(
+                posting, np.searchsorted(posting, recipe_id), recipe_id)
+        new_ids, new_sizes = np.unique(pairs[:, 1], return_counts=True)
+        recipe_ids = np.concatenate([recipe_ids, new_ids])
+        order = np.argsort(recipe_ids, kind='stable')
+        self._state = (postings, recipe_ids[order],
+                       np.concatenate([sizes, new_sizes])[order])
+
+    def _changes_since(self, version, remote):
+        """Изменённые рецепты или None, если в версиях есть пропуск.
+
+        Пропуск - удалённая старая версия или ещё не зафиксированная
+        запись: её данные уже в базе (версия пишется после фиксации),
+        поэтому полная перестройка их увидит.
+        """
+        changes = list(CookIndexChange.objects.using(
+            DEFAULT_DB_ALIAS).filter(pk__gt=version, pk__lte=remote
+                                     ).values_list('recipe_ids', flat=True))
+        if len(changes) != remote - version:
+            return None
+        return {recipe_id for ids in changes for recipe_id in ids}
+
+    def sync(self):
+        """Догоняет изменения, сделанные в других процессах."""
+        remote = current_version()
+        if remote == self._version:
+            return
+        with self._lock:
+            if remote == self._version:
+                return
+            changed = None
+            if 0 <= self._version <= remote <= self._version + MAX_DELTAS:
+                changed = self._changes_since(self._version, remote)
+            if changed is None:
+                self._rebuild()
+            else:
+                self._apply(changed)
+            self._version = remote
+
+    def search(self, ingredient_ids, max_missing):
+        """Возвращает id рецептов и число недостающих ингредиентов.
+
+        Сначала рецепты, где не хватает меньше всего, затем те, где
+        совпало больше ингредиентов, затем более новые.
+        """
+        self.sync()
+        all_postings, all_recipe_ids, sizes = self._state
+        postings = [all_postings[ingredient_id]
+                    for ingredient_id in set(ingredient_ids)
+                    if ingredient_id in all_postings]
+        if not postings:
+            return [], []
+        recipe_ids, matched = np.unique(
+            np.concatenate(postings), return_counts=True)
+        positions = np.searchsorted(all_recipe_ids, recipe_ids)
+        missing = sizes[positions] - matched
+        keep = missing <= max_missing
+        recipe_ids, matched, missing = (
+            recipe_ids[keep], matched[keep], missing[keep])
+        order = np.lexsort((-recipe_ids, -matched, missing))
+        return recipe_ids[order].tolist(), missing[order].tolist()
+
+
+def current_version():
+    return CookIndexChange.objects.using(DEFAULT_DB_ALIAS).order_by(
+        '-pk').values_list('pk', flat=True).first() or 0
+
+
+def notify_changed(recipe_ids):
+    """Сообщает всем процессам, что состав рецептов изменился."""
+    change = CookIndexChange.objects.using(DEFAULT_DB_ALIAS).create(
+        recipe_ids=sorted(set(recipe_ids)))
+    # Процессы, отставшие больше чем на MAX_DELTAS, всё равно
+    # перестраивают индекс целиком.
+    CookIndexChange.objects.using(DEFAULT_DB_ALIAS).filter(
+        pk__lte=change.pk - MAX_DELTAS).delete()
+
+
+def _flush(pending):
+    if pending:
+        recipe_ids = set(pending)
+        pending.clear()
+        notify_changed(recipe_ids)
+
+
+def notify_on_commit(recipe_ids):
+    """notify_changed после фиксации транзакции, если сообщения не
+    приостановлены в этом потоке.
+
+    Рецепты копятся в общем для соединения множестве, и первый
+    сработавший после фиксации обработчик отправляет их все одной
+    версией: каскадное удаление или строки состава из админки не
+    расходуют по версии на строку.
+    """
+    if getattr(_paused, 'active', False):
+        return
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'cook_index_pending', None)
+    if pending is None:
+        pending = connection.cook_index_pending = set()
+    pending.update(recipe_ids)
+    transaction.on_commit(lambda: _flush(pending))
+
+
+@contextmanager
+def notifications_paused():
+    """Приостанавливает notify_on_commit из сигналов: массовое удаление
+    сообщает обо всех рецептах одной версией, а не версией на рецепт."""
+    _paused.active = True
+    try:
+        yield
+    finally:
+        _paused.active = False
+
+
+cook_index = CookIndex()
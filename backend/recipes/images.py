@@ -0,0 +1,96 @@
+"""Обработка фотографий рецептов.
+
+Оригинал очищается от EXIF при загрузке, а уменьшенные копии для
+карточки и страницы рецепта строятся задачей из очереди после ответа.
+"""
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+# Имя варианта: (ширина, высота, обрезать ли до точного размера).
+VARIANTS = {
+    'card': (480, 360, True),
+    'detail': (1200, 900, False),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True,
+                      'progressive': True}),
+}
+VARIANTS_DIR = 'recipes/variants/'
+REENCODE_FORMATS = ('JPEG', 'PNG', 'WEBP')
+
+
+class ImageTooLarge(ValueError):
+    pass
+
+
+def clean_image(file):
+    """Проверяет картинку и пересохраняет её без метаданных EXIF.
+
+    Возвращает байты изображения и расширение файла.
+    """
+    with Image.open(file) as image:
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise ImageTooLarge
+        image_format = image.format
+        if image_format not in REENCODE_FORMATS:
+            file.seek(0)
+            return file.read(), image_format.lower()
+        buffer = BytesIO()
+        options = {'quality': 90} if image_format == 'JPEG' else {}
+        ImageOps.exif_transpose(image).save(buffer, image_format, **options)
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    return buffer.getvalue(), extension
+
+
+def _render(image, size, crop):
+    if crop:
+        return ImageOps.fit(image, size, Image.LANCZOS)
+    resized = image.copy()
+    resized.thumbnail(size, Image.LANCZOS)
+    return resized
+
+
+def _save_variants(name):
+    stem = posixpath.splitext(posixpath.basename(name))[0]
+    variants = {}
+    with default_storage.open(name) as file, Image.open(file) as image:
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for variant, (width, height, crop) in VARIANTS.items():
+            rendered = _render(image, (width, height), crop)
+            variants[variant] = {}
+            for extension, (image_format, options) in FORMATS.items():
+                buffer = BytesIO()
+                rendered.save(buffer, image_format, **options)
+                variants[variant][extension] = default_storage.save(
+                    f'{VARIANTS_DIR}{stem}_{variant}.{extension}',
+                    ContentFile(buffer.getvalue())
+                )
+    return variants
+
+
+def variant_names(variants):
+    return [name for formats in variants.get('files', {}).values()
+            for name in formats.values()]
+
+
+def build_variants(recipe_id):
+    """Строит уменьшенные копии фотографии рецепта."""
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants').first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    if recipe.image_variants.get('source') == name:
+        return
+    Recipe.objects.filter(pk=recipe_id, image=name).update(
+        image_variants={'source': name, 'files': _save_variants(name)}
+    )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import rebuild, refresh
+
+
+class Command(BaseCommand):
+    """Пересчитывает таблицу похожих рецептов."""
+    help = ('Без аргументов пересчитывает соседей всех рецептов, '
+            'с --recipe только затронутых изменением указанных.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipe', type=int, action='append',
+                            help='id изменённого рецепта')
+
+    def handle(self, *args, **options):
+        if options['recipe']:
+            refresh(options['recipe'])
+        else:
+            rebuild()
+        self.stdout.write('Похожие рецепты пересчитаны')
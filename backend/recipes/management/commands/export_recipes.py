@@ -0,0 +1,102 @@
+import tarfile
+from collections import defaultdict
+from itertools import islice
+
+import orjson
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.images import variant_names
+from recipes.models import IngredientInRecipe, Recipe, Tag, TagRecipe
+
+RECIPE_FIELDS = ('pk', 'name', 'text', 'cooking_time', 'image',
+                 'image_variants', 'author__email')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    """Выгружает рецепты в JSON Lines и их фото в tar-архив."""
+    help = ('Пишет теги и рецепты с ингредиентами по строке JSON на '
+            'запись; рецепты читаются из базы частями, так что память '
+            'не растёт с их числом. Загрузка - import_recipes.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Файл .jsonl для рецептов.')
+        parser.add_argument('--media', help='Tar-архив для фото рецептов.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        media = None
+        if options['media']:
+            media = tarfile.open(options['media'], 'w|')
+        exported = 0
+        try:
+            with open(options['output'], 'wb') as output:
+                for tag in Tag.objects.order_by('pk').values(
+                        'slug', 'name', 'color'):
+                    output.write(self.line('tag', tag))
+                recipes = Recipe.objects.order_by('pk').values(*RECIPE_FIELDS)
+                for chunk in chunked(
+                        recipes.iterator(chunk_size=options['chunk_size']),
+                        options['chunk_size']):
+                    self.write_chunk(chunk, output, media)
+                    exported += len(chunk)
+        finally:
+            if media is not None:
+                media.close()
+        self.stdout.write(f'Выгружено рецептов: {exported}')
+
+    @staticmethod
+    def line(kind, record):
+        return orjson.dumps({'type': kind, **record}) + b'\n'
+
+    def write_chunk(self, chunk, output, media):
+        recipe_ids = [recipe['pk'] for recipe in chunk]
+        ingredients = defaultdict(list)
+        for recipe_id, *ingredient in IngredientInRecipe.objects.filter(
+                recipe_id__in=recipe_ids).order_by('pk').values_list(
+                'recipe_id', 'ingredient__name',
+                'ingredient__measurement_unit', 'amount'):
+            ingredients[recipe_id].append(ingredient)
+        tags = defaultdict(list)
+        for recipe_id, slug in TagRecipe.objects.filter(
+                recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'tag__slug'):
+            tags[recipe_id].append(slug)
+        files = set()
+        for recipe in chunk:
+            recipe_id = recipe.pop('pk')
+            output.write(self.line('recipe', {
+                'id': recipe_id,
+                'author': recipe.pop('author__email'),
+                **recipe,
+                'tags': tags[recipe_id],
+                'ingredients': ingredients[recipe_id],
+            }))
+            if recipe['image']:
+                files.add(recipe['image'])
+                files.update(variant_names(recipe['image_variants']))
+        if media is not None:
+            # Одинаковые фото разных частей попадут в архив повторно,
+            # зато множество имён не растёт со всей выгрузкой.
+            for name in sorted(files):
+                self.add_file(media, name)
+
+    def add_file(self, media, name):
+        try:
+            file = default_storage.open(name)
+        except FileNotFoundError:
+            self.stderr.write(f'Нет файла {name}')
+            return
+        with file:
+            info = tarfile.TarInfo(name)
+            info.size = file.size
+            media.addfile(info, file)
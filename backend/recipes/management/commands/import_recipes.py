@@ -0,0 +1,167 @@
+import tarfile
+from collections import Counter
+
+import orjson
+from django.contrib.auth import get_user_model
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from recipes.cook_index import notify_on_commit
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe, Tag,
+                            TagRecipe, tags_mask)
+from recipes.signals import recipe_count_changed
+from recipes.storage import acquire_file
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Загружает рецепты, выгруженные командой export_recipes."""
+    help = ('Читает JSON Lines построчно и вставляет рецепты пакетами. '
+            'Авторы сопоставляются по email, теги - по слагу, '
+            'ингредиенты - по названию и единице измерения.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='Файл .jsonl от export_recipes.')
+        parser.add_argument('--media', help='Tar-архив с фото рецептов.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--author',
+            help='Email автора для рецептов, чьих авторов здесь нет.'
+        )
+
+    def handle(self, *args, **options):
+        self.default_author = None
+        if options['author']:
+            self.default_author = User.objects.filter(
+                email=options['author']).first()
+            if self.default_author is None:
+                raise CommandError(f'Нет пользователя {options["author"]}')
+        self.authors = {}
+        self.tags = dict(Tag.objects.values_list('slug', 'pk'))
+        self.ingredients = {}
+        self.imported = self.skipped = 0
+        if options['media']:
+            self.import_media(options['media'])
+        batch = []
+        with open(options['input'], 'rb') as source:
+            for line in source:
+                record = orjson.loads(line)
+                if record['type'] == 'tag':
+                    self.import_tag(record)
+                    continue
+                batch.append(record)
+                if len(batch) >= options['batch_size']:
+                    self.import_batch(batch)
+                    batch = []
+        if batch:
+            self.import_batch(batch)
+        recipe_count_changed()
+        self.stdout.write(
+            f'Загружено рецептов: {self.imported}, '
+            f'пропущено без автора: {self.skipped}. Пересчитайте похожие '
+            'рецепты командой build_similar_recipes.'
+        )
+
+    def import_media(self, path):
+        """Кладёт файлы архива в хранилище под теми же именами.
+
+        Имена фото - хеш содержимого, так что уже существующий файл
+        совпадает с файлом из архива.
+        """
+        copied = 0
+        with tarfile.open(path, 'r|') as media:
+            for member in media:
+                if not member.isfile() or default_storage.exists(
+                        member.name):
+                    continue
+                with media.extractfile(member) as file:
+                    default_storage._save(member.name, File(file))
+                copied += 1
+        self.stdout.write(f'Скопировано файлов: {copied}')
+
+    def import_tag(self, record):
+        if record['slug'] not in self.tags:
+            self.tags[record['slug']] = Tag.objects.create(
+                slug=record['slug'], name=record['name'],
+                color=record['color']).pk
+
+    def resolve_authors(self, emails):
+        missing = set(emails) - self.authors.keys()
+        if missing:
+            self.authors.update(User.objects.filter(
+                email__in=missing).values_list('email', 'pk'))
+        for email in missing - self.authors.keys():
+            self.authors[email] = (self.default_author.pk
+                                   if self.default_author else None)
+
+    def resolve_ingredients(self, keys):
+        missing = set(keys) - self.ingredients.keys()
+        if not missing:
+            return
+        for pk, name, unit in Ingredient.objects.filter(
+                name__in={name for name, _ in missing}).order_by(
+                '-pk').values_list('pk', 'name', 'measurement_unit'):
+            if (name, unit) in missing:
+                self.ingredients[name, unit] = pk
+        for name, unit in missing - self.ingredients.keys():
+            self.ingredients[name, unit] = Ingredient.objects.create(
+                name=name, measurement_unit=unit).pk
+
+    @transaction.atomic
+    def import_batch(self, batch):
+        self.resolve_authors(record['author'] for record in batch)
+        self.resolve_ingredients(
+            (name, unit) for record in batch
+            for name, unit, _ in record['ingredients'])
+        records = [record for record in batch
+                   if self.authors[record['author']] is not None]
+        self.skipped += len(batch) - len(records)
+        recipes = [self.build_recipe(record) for record in records]
+        self.insert(recipes)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe_id=recipe.pk,
+                               ingredient_id=self.ingredients[name, unit],
+                               amount=amount)
+            for recipe, record in zip(recipes, records)
+            for name, unit, amount in record['ingredients']
+        )
+        TagRecipe.objects.bulk_create(
+            TagRecipe(recipe_id=recipe.pk, tag_id=self.tags[slug])
+            for recipe, record in zip(recipes, records)
+            for slug in record['tags']
+        )
+        # bulk_create не шлёт сигналы: ссылки на фото и индекс
+        # ингредиентов обновляются здесь.
+        for name, count in Counter(
+                recipe.image.name for recipe in recipes
+                if recipe.image).items():
+            acquire_file(name, count)
+        recipe_ids = [recipe.pk for recipe in recipes]
+        notify_on_commit(recipe_ids)
+        self.imported += len(recipes)
+
+    def build_recipe(self, record):
+        return Recipe(
+            author_id=self.authors[record['author']],
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=record['image'],
+            image_variants=record['image_variants'],
+            tags_mask=tags_mask(self.tags[slug] for slug in record['tags']),
+        )
+
+    @staticmethod
+    def insert(recipes):
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # SQLite не возвращает id из bulk_create: пакет получает id
+            # подряд после текущего максимума внутри транзакции.
+            last = Recipe.all_objects.aggregate(Max('pk'))['pk__max']
+            start = (last or 0) + 1
+            for pk, recipe in enumerate(recipes, start):
+                recipe.pk = pk
+        Recipe.objects.bulk_create(recipes)
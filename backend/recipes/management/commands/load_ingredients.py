@@ -1,12 +1,15 @@
 from csv import reader
 
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
     """Создает записи в модели Ingredients из списка."""
+    # Одна транзакция - одна новая версия каталога и одна сборка снимка.
+    @transaction.atomic
     def handle(self, *args, **kwargs):
         with open(
                 'recipes/data/ingredients.csv', 'r',
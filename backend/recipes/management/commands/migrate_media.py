@@ -0,0 +1,94 @@
+import posixpath
+import re
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from recipes.images import VARIANTS_DIR, build_variants, variant_names
+from recipes.models import MediaFile, Recipe
+
+HASHED_NAME = re.compile(r'(?:^|/)([0-9a-f]{2})/\1[0-9a-f]{62}(\.\w+)?$')
+IMAGES_DIR = Recipe._meta.get_field('image').upload_to
+
+
+class Command(BaseCommand):
+    """Переносит фото рецептов в хранилище с именами по содержимому."""
+    help = ('Переименовывает фото рецептов по хешу содержимого, '
+            'строит их копии и пересчитывает ссылки на файлы.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prune', action='store_true',
+            help='Удалить файлы, на которые не ссылается ни один рецепт.'
+        )
+
+    def handle(self, *args, **options):
+        renamed = self.rename_images()
+        self.rebuild_references()
+        referenced = self.referenced_names()
+        for name in renamed:
+            if name not in referenced:
+                default_storage.delete(name)
+        self.stdout.write(f'Переименовано файлов: {len(renamed)}')
+        if options['prune']:
+            pruned = self.prune(referenced)
+            self.stdout.write(f'Удалено файлов без ссылок: {pruned}')
+
+    def rename_images(self):
+        renamed = []
+        recipes = Recipe.all_objects.exclude(image='').values_list(
+            'pk', 'image')
+        for pk, name in recipes.iterator(chunk_size=500):
+            if not HASHED_NAME.search(name):
+                try:
+                    with default_storage.open(name) as file:
+                        new_name = default_storage.save(name, file)
+                except FileNotFoundError:
+                    self.stderr.write(f'Нет файла {name} у рецепта {pk}')
+                    continue
+                Recipe.all_objects.filter(pk=pk).update(
+                    image=new_name, image_variants={}
+                )
+                renamed.append(name)
+            build_variants(pk)
+        return renamed
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild_references():
+        MediaFile.objects.all().delete()
+        MediaFile.objects.bulk_create(
+            MediaFile(name=item['image'], references=item['references'])
+            for item in Recipe.all_objects.exclude(image='').values(
+                'image').annotate(references=Count('pk')).order_by()
+        )
+
+    def prune(self, referenced):
+        pruned = 0
+        for directory in (IMAGES_DIR, VARIANTS_DIR):
+            for name in self.walk(directory.rstrip('/')):
+                if name not in referenced:
+                    default_storage.delete(name)
+                    pruned += 1
+        return pruned
+
+    @staticmethod
+    def referenced_names():
+        referenced = set()
+        recipes = Recipe.all_objects.exclude(image='').values_list(
+            'image', 'image_variants')
+        for name, variants in recipes.iterator(chunk_size=1000):
+            referenced.add(name)
+            referenced.update(variant_names(variants))
+        return referenced
+
+    def walk(self, directory):
+        if not default_storage.exists(directory):
+            return
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield posixpath.join(directory, name)
+        for subdirectory in directories:
+            yield from self.walk(posixpath.join(directory, subdirectory))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from recipes.purge import PURGE_BATCH_SIZE, purge_deleted
+
+
+class Command(BaseCommand):
+    """Удаляет помеченные на удаление рецепты и пользователей."""
+    help = ('Пачками удаляет рецепты и пользователей с флагом deleted '
+            'вместе со связанными строками и фото без ссылок.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            default=PURGE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            purged = purge_deleted(options['batch_size'])
+            if not purged:
+                break
+            total += purged
+        self.stdout.write(f'Удалено объектов: {total}')
@@ -0,0 +1,33 @@
+# Generated by Django 3.2 on 2026-10-19 09:05
+
+from django.db import migrations, models
+
+MAX_MASK_TAG_ID = 63
+
+
+def fill_tags_mask(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    TagRecipe = apps.get_model('recipes', 'TagRecipe')
+    masks = {}
+    pairs = TagRecipe.objects.filter(
+        tag_id__lt=MAX_MASK_TAG_ID).values_list('recipe_id', 'tag_id')
+    for recipe_id, tag_id in pairs.iterator():
+        masks[recipe_id] = masks.get(recipe_id, 0) | 1 << tag_id
+    for recipe_id, mask in masks.items():
+        Recipe.objects.filter(pk=recipe_id).update(tags_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_similarrecipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Битовая маска тегов'),
+        ),
+        migrations.RunPython(fill_tags_mask, migrations.RunPython.noop),
+    ]
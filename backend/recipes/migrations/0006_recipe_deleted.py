@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_tags_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Помечен на удаление'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(deleted=True), fields=['deleted'], name='recipe_deleted_idx'),
+        ),
+    ]
@@ -1,12 +1,39 @@
 from typing import Optional
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
-from django.db.models import Exists, OuterRef
+from django.db.models import Exists, F, OuterRef, Q
 
 User = get_user_model()
 
+TAG_SLUGS_CACHE_KEY = 'tags:ids_by_slug'
+RECIPE_COUNT_VERSION_KEY = 'recipes:count_version'
+CATALOGUE_VERSION_KEY = 'catalogue:{}:version'
+MEMBERSHIPS_VERSION_KEY = 'memberships:{}:version'
+# Биты 0..62 знакового BigIntegerField: тег с id < 63 кодируется битом.
+MAX_MASK_TAG_ID = 63
+
+
+def tags_mask(tag_ids):
+    mask = 0
+    for tag_id in tag_ids:
+        if tag_id < MAX_MASK_TAG_ID:
+            mask |= 1 << tag_id
+    return mask
+
+
+class TagQuerySet(models.QuerySet):
+
+    def ids_by_slug(self):
+        """Словарь «слаг → id», закешированный до изменения тегов."""
+        ids = cache.get(TAG_SLUGS_CACHE_KEY)
+        if ids is None:
+            ids = dict(self.values_list('slug', 'id'))
+            cache.set(TAG_SLUGS_CACHE_KEY, ids, None)
+        return ids
+
 
 class Tag(models.Model):
     """Модель тега"""
@@ -24,6 +51,8 @@ class Tag(models.Model):
         verbose_name='Слаг',
     )
 
+    objects = TagQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
@@ -53,6 +82,28 @@ class Ingredient(models.Model):
 
 class RecipeQueryset(models.QuerySet):
 
+    def with_tags(self, tag_ids, match_all=False):
+        """Рецепты с любым (или со всеми) из тегов без join по тегам.
+
+        Если все теги помещаются в битовую маску, фильтр - условие на
+        одну колонку рецепта, иначе - подзапросы EXISTS.
+        """
+        tag_ids = set(tag_ids)
+        if all(tag_id < MAX_MASK_TAG_ID for tag_id in tag_ids):
+            mask = tags_mask(tag_ids)
+            matched = self.alias(matched_tags=F('tags_mask').bitand(mask))
+            if match_all:
+                return matched.filter(matched_tags=mask)
+            return matched.exclude(matched_tags=0)
+        if match_all:
+            return self.filter(*(
+                Exists(TagRecipe.objects.filter(
+                    recipe_id=OuterRef('pk'), tag_id=tag_id))
+                for tag_id in tag_ids
+            ))
+        return self.filter(Exists(TagRecipe.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids)))
+
     def add_user_annotations(self, user_id: Optional[int]):
         return self.annotate(
             is_favorite=Exists(
@@ -63,6 +114,13 @@ class RecipeQueryset(models.QuerySet):
         )
 
 
+class RecipeManager(models.Manager.from_queryset(RecipeQueryset)):
+    """Рецепты без помеченных на удаление."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted=False)
+
+
 class Recipe(models.Model):
     """Модель рецепта"""
     name = models.CharField(
@@ -89,6 +147,12 @@ class Recipe(models.Model):
         verbose_name='Фото готовой еды',
         upload_to='recipes/image/'
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     tags = models.ManyToManyField(
         Tag,
         through='TagRecipe',
@@ -96,14 +160,35 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Тег рецепта'
     )
+    tags_mask = models.BigIntegerField(
+        verbose_name='Битовая маска тегов',
+        default=0,
+        editable=False
+    )
     cooking_time = models.PositiveSmallIntegerField(
         validators=[MinValueValidator(1)],
         verbose_name='Время приготовления'
     )
+    deleted = models.BooleanField(
+        verbose_name='Помечен на удаление',
+        default=False,
+        editable=False
+    )
+    created = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True,
+        null=True,
+        db_index=True
+    )
 
-    objects = RecipeQueryset.as_manager()
+    objects = RecipeManager()
+    all_objects = RecipeQueryset.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(fields=['deleted'], condition=Q(deleted=True),
+                         name='recipe_deleted_idx')
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -212,3 +297,68 @@ class ShoppingList(models.Model):
 
     def __str__(self):
         return f'{self.recipe} в списке покупок у {self.user}'
+
+
+class MediaFile(models.Model):
+    """Файл медиа-хранилища и число рецептов, ссылающихся на него"""
+    name = models.CharField(
+        max_length=255,
+        unique=True,
+        verbose_name='Имя файла'
+    )
+    references = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Число ссылок'
+    )
+
+    class Meta:
+        verbose_name = 'Медиафайл'
+        verbose_name_plural = 'Медиафайлы'
+
+    def __str__(self):
+        return self.name
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт и мера сходства с исходным"""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство'
+    )
+
+    class Meta:
+        ordering = ['-score']
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='similar_recipe_score_idx')
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
+
+
+class CookIndexChange(models.Model):
+    """Рецепты, состав которых изменился; id - номер версии индекса"""
+    recipe_ids = models.JSONField(
+        verbose_name='Рецепты'
+    )
+
+    class Meta:
+        verbose_name = 'Изменение индекса ингредиентов'
+        verbose_name_plural = 'Изменения индекса ингредиентов'
+
+    def __str__(self):
+        return f'Версия {self.pk}'
@@ -0,0 +1,122 @@
+"""Удаление рецептов и пользователей в два этапа.
+
+Сначала объекты только помечаются флагом ``deleted``: менеджер
+``Recipe.objects`` и API сразу перестают их показывать. Затем задача
+``recipes.purge_deleted`` (или ``manage.py purge_deleted``) удаляет их
+пачками: связанные строки стираются отдельными DELETE по
+``PURGE_BATCH_SIZE`` строк без загрузки в память, а сами рецепты - через
+ORM, чтобы сигналы освободили их фото и уменьшенные копии. Раз сигналы
+связанных строк не срабатывают, версии закешированных наборов
+(api.memberships) затронутых пользователей меняются явно.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from jobs.queue import enqueue
+from users.models import Subscribe
+from .cook_index import notifications_paused, notify_changed
+from .models import (Favorite, IngredientInRecipe, Recipe, ShoppingList,
+                     SimilarRecipe, TagRecipe)
+from .signals import memberships_changed, recipe_count_changed
+
+User = get_user_model()
+
+PURGE_BATCH_SIZE = 500
+RECIPE_RELATIONS = (
+    (IngredientInRecipe, 'recipe'),
+    (TagRecipe, 'recipe'),
+    (Favorite, 'recipe'),
+    (ShoppingList, 'recipe'),
+    (SimilarRecipe, 'recipe'),
+    (SimilarRecipe, 'similar'),
+)
+USER_RELATIONS = (
+    (Favorite, 'user'),
+    (ShoppingList, 'user'),
+    (Subscribe, 'user'),
+    (Subscribe, 'author'),
+)
+
+
+def soft_delete_recipes(queryset):
+    """Помечает рецепты удалёнными и ставит в очередь их удаление.
+
+    Списки похожих рецептов, где были удалённые, пересчитываются
+    задачей recipes.refresh_similar.
+    """
+    recipe_ids = list(queryset.filter(deleted=False).values_list(
+        'pk', flat=True))
+    Recipe.all_objects.filter(pk__in=recipe_ids).update(deleted=True)
+    transaction.on_commit(recipe_count_changed)
+    if recipe_ids:
+        enqueue('recipes.refresh_similar', recipe_ids=recipe_ids)
+    enqueue('recipes.purge_deleted')
+
+
+def soft_delete_users(queryset):
+    """Помечает пользователей и их рецепты удалёнными.
+
+    Пользователь сразу теряет доступ: он деактивируется, а его токены
+    удаляются.
+    """
+    user_ids = list(queryset.values_list('pk', flat=True))
+    User.objects.filter(pk__in=user_ids).update(deleted=True,
+                                                is_active=False)
+    Token.objects.filter(user_id__in=user_ids).delete()
+    soft_delete_recipes(Recipe.objects.filter(author_id__in=user_ids))
+
+
+def delete_rows(queryset, batch_size):
+    """Удаляет строки запроса пачками, без сигналов и загрузки объектов."""
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += queryset.model._base_manager.filter(
+            pk__in=ids)._raw_delete(queryset.db)
+
+
+def members_changed(*querysets):
+    """Меняет версии наборов пользователей, чьи строки будут удалены."""
+    user_ids = set()
+    for queryset in querysets:
+        user_ids.update(queryset.values_list('user_id', flat=True))
+    if user_ids:
+        transaction.on_commit(lambda: memberships_changed(*user_ids))
+
+
+def purge_recipes(batch_size):
+    recipe_ids = list(Recipe.all_objects.filter(deleted=True).values_list(
+        'pk', flat=True)[:batch_size])
+    members_changed(Favorite.objects.filter(recipe_id__in=recipe_ids),
+                    ShoppingList.objects.filter(recipe_id__in=recipe_ids))
+    for model, field in RECIPE_RELATIONS:
+        delete_rows(model.objects.filter(**{f'{field}__in': recipe_ids}),
+                    batch_size)
+    with transaction.atomic():
+        with notifications_paused():
+            Recipe.all_objects.filter(pk__in=recipe_ids).delete()
+        if recipe_ids:
+            transaction.on_commit(lambda: notify_changed(recipe_ids))
+    return len(recipe_ids)
+
+
+def purge_users(batch_size):
+    # Рецепты пользователя к этому времени уже удалены purge_recipes.
+    user_ids = list(User.objects.filter(deleted=True).exclude(
+        recipes__isnull=False).values_list('pk', flat=True)[:batch_size])
+    members_changed(Subscribe.objects.filter(author_id__in=user_ids))
+    for model, field in USER_RELATIONS:
+        delete_rows(model.objects.filter(**{f'{field}__in': user_ids}),
+                    batch_size)
+    with transaction.atomic():
+        User.objects.filter(pk__in=user_ids).delete()
+    return len(user_ids)
+
+
+def purge_deleted(batch_size=PURGE_BATCH_SIZE):
+    """Удаляет пачку помеченных рецептов, а когда их не осталось -
+    пачку пользователей. Возвращает число удалённых объектов."""
+    return purge_recipes(batch_size) or purge_users(batch_size)
@@ -0,0 +1,159 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from jobs.queue import enqueue
+from users.models import Subscribe
+from .cook_index import notify_on_commit
+from .images import variant_names
+from .models import (CATALOGUE_VERSION_KEY, MEMBERSHIPS_VERSION_KEY,
+                     RECIPE_COUNT_VERSION_KEY, TAG_SLUGS_CACHE_KEY, Favorite,
+                     Ingredient, IngredientInRecipe, Recipe, ShoppingList,
+                     Tag, TagRecipe, tags_mask)
+from .storage import acquire_file, release_file
+
+
+@receiver(pre_save, sender=Recipe)
+def remember_old_image(sender, instance, **kwargs):
+    """Запоминает прежнее фото, чтобы освободить его после сохранения."""
+    instance._old_image = Recipe.objects.filter(pk=instance.pk).values(
+        'image', 'image_variants').first() if instance.pk else None
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    """Пересчитывает ссылки на фото и запускает построение копий."""
+    old = getattr(instance, '_old_image', None)
+    if old is None or old['image'] != instance.image.name:
+        if instance.image:
+            acquire_file(instance.image.name)
+        if old is not None and old['image']:
+            release_file(old['image'], variant_names(old['image_variants']))
+    if instance.image and (
+            instance.image_variants.get('source') != instance.image.name):
+        enqueue('recipes.build_variants', recipe_id=instance.pk)
+
+
+def recipe_count_changed():
+    """Сбрасывает закешированные числа рецептов для пагинации."""
+    cache.set(RECIPE_COUNT_VERSION_KEY, time.time_ns(), None)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(recipe_count_changed)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    """Освобождает фото удалённого рецепта и убирает его из индекса."""
+    notify_on_commit([instance.pk])
+    transaction.on_commit(recipe_count_changed)
+    if instance.image:
+        release_file(instance.image.name,
+                     variant_names(instance.image_variants))
+
+
+def update_tags_mask(recipe):
+    """Пересчитывает битовую маску тегов рецепта."""
+    recipe.tags_mask = tags_mask(TagRecipe.objects.filter(
+        recipe_id=recipe.pk).values_list('tag_id', flat=True))
+    Recipe.objects.filter(pk=recipe.pk).update(tags_mask=recipe.tags_mask)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        update_tags_mask(instance)
+        return
+    recipes = Recipe.objects.filter(pk__in=pk_set) if pk_set else (
+        Recipe.objects.filter(tags_mask__gt=0))
+    for recipe in recipes.only('pk'):
+        update_tags_mask(recipe)
+
+
+@receiver(post_save, sender=TagRecipe)
+@receiver(post_delete, sender=TagRecipe)
+def tag_recipe_changed(sender, instance, **kwargs):
+    """Поддерживает маску при правке тегов через админку."""
+    update_tags_mask(Recipe(pk=instance.recipe_id))
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    """Обновляет индекс подбора по холодильнику при правке состава через
+    админку; API сообщает об изменениях сам после bulk_create. Строки
+    одной транзакции дают одну версию индекса."""
+    notify_on_commit([instance.recipe_id])
+
+
+def on_commit_once(key, func):
+    """transaction.on_commit, который выполняет func один раз на
+    транзакцию для каждого key."""
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_on_commit', None)
+    if pending is None:
+        pending = connection.pending_on_commit = set()
+    pending.add(key)
+
+    def run():
+        if key in pending:
+            pending.discard(key)
+            func()
+
+    # Обработчик ставится каждый раз: зарегистрированный раньше мог
+    # исчезнуть при откате точки сохранения.
+    transaction.on_commit(run)
+
+
+def catalogue_changed(name):
+    """Меняет версию каталога и ставит в очередь сборку готового ответа
+    (api.snapshots), чтобы её не делал первый запрос после изменения."""
+    cache.set(CATALOGUE_VERSION_KEY.format(name), time.time_ns(), None)
+    enqueue('api.build_snapshot', catalogue=name)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def tag_changed(sender, **kwargs):
+    cache.delete(TAG_SLUGS_CACHE_KEY)
+    on_commit_once('catalogue:tags', lambda: catalogue_changed('tags'))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    on_commit_once('catalogue:ingredients',
+                   lambda: catalogue_changed('ingredients'))
+
+
+def memberships_changed(*user_ids):
+    """Делает закешированные избранное, корзину и подписки пользователей
+    неактуальными (api.memberships).
+
+    Новая версия - текущее время в наносекундах, а не счётчик: если
+    ключ версии вытеснят из кеша, старые наборы не воскреснут.
+    """
+    version = time.time_ns()
+    cache.set_many({MEMBERSHIPS_VERSION_KEY.format(user_id): version
+                    for user_id in user_ids}, None)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingList)
+@receiver(post_delete, sender=ShoppingList)
+@receiver(post_save, sender=Subscribe)
+@receiver(post_delete, sender=Subscribe)
+def membership_changed(sender, instance, **kwargs):
+    """Любая запись в избранное, корзину или подписки, включая админку."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: memberships_changed(user_id))
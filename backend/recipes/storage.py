@@ -0,0 +1,74 @@
+"""Хранилище медиа с именами по содержимому и подсчётом ссылок.
+
+Файл называется по SHA-256 своего содержимого, поэтому одинаковые
+загрузки хранятся один раз, а отдавать файлы можно с заголовком
+``Cache-Control: immutable``. Таблица ``MediaFile`` хранит число
+рецептов, ссылающихся на файл; когда оно падает до нуля, файл и его
+уменьшенные копии удаляются после коммита.
+"""
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import F
+
+from .models import MediaFile
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, называющее файлы по хешу содержимого."""
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return self._save(name, content)
+
+
+def acquire_file(name, count=1):
+    """Увеличивает число ссылок на файл."""
+    MediaFile.objects.get_or_create(name=name)
+    MediaFile.objects.filter(name=name).update(
+        references=F('references') + count
+    )
+
+
+def _delete_unreferenced(names):
+    if MediaFile.objects.filter(name=names[0]).exists():
+        return
+    for name in names:
+        default_storage.delete(name)
+
+
+def release_file(name, derived=()):
+    """Уменьшает число ссылок и удаляет файл, когда их не осталось.
+
+    ``derived`` - имена файлов, построенных из этого (уменьшенные копии).
+    """
+    with transaction.atomic():
+        media = MediaFile.objects.select_for_update().filter(
+            name=name).first()
+        if media is None:
+            return
+        if media.references > 1:
+            media.references = F('references') - 1
+            media.save(update_fields=['references'])
+            return
+        media.delete()
+    names = [name, *derived]
+    transaction.on_commit(lambda: _delete_unreferenced(names))
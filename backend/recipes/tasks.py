@@ -0,0 +1,27 @@
+from jobs.queue import enqueue, task
+
+from .images import build_variants
+from .purge import purge_deleted
+from .similarity import refresh
+
+
+@task('recipes.build_variants')
+def build_recipe_variants(recipe_id):
+    build_variants(recipe_id)
+
+
+@task('recipes.refresh_similar', batch=True)
+def refresh_similar(payloads):
+    # Каждый вызов refresh строит матрицу по всем рецептам, поэтому
+    # изменения берутся пачкой (до BATCH_LIMIT задач за раз).
+    refresh({
+        recipe_id for payload in payloads
+        for recipe_id in payload.get('recipe_ids', [payload.get('recipe_id')])
+    })
+
+
+@task('recipes.purge_deleted', batch=True)
+def purge_deleted_batch(payloads):
+    # Задача удаляет одну пачку и ставит себя снова, пока есть что удалять.
+    if purge_deleted():
+        enqueue('recipes.purge_deleted')
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+
+User = get_user_model()
+
+LOCMEM_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES, JOB_WORKER_THREADS=0)
+class RecipesTestCase(TestCase):
+    """Тест с кешем в памяти; задачи очереди запускаются вручную."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='pass',
+            first_name='Имя', last_name='Фамилия')
+
+    def create_recipe(self, name, ingredients=(), tags=()):
+        recipe = Recipe.objects.create(
+            author=self.author, name=name, text='Текст', cooking_time=10)
+        recipe.tags.set(tags)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    @staticmethod
+    def create_ingredients(*names):
+        return [Ingredient.objects.create(name=name, measurement_unit='г')
+                for name in names]
+
+    @staticmethod
+    def create_tag(slug):
+        return Tag.objects.create(name=slug, slug=slug, color='#00FF00')
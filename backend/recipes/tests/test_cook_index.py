@@ -0,0 +1,63 @@
+from django.db import transaction
+
+from recipes.cook_index import CookIndex, current_version
+from recipes.models import CookIndexChange, IngredientInRecipe
+from .base import RecipesTestCase
+
+
+class CookIndexChangesTest(RecipesTestCase):
+
+    def setUp(self):
+        self.egg, self.milk, self.flour = self.create_ingredients(
+            'яйцо', 'молоко', 'мука')
+        self.omelette = self.create_recipe('Омлет', [self.egg, self.milk])
+        self.pancakes = self.create_recipe('Блины', [self.egg, self.flour])
+        self.index = CookIndex()
+        self.index.sync()
+
+    def test_rows_of_one_transaction_share_a_version(self):
+        version = current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            for row in IngredientInRecipe.objects.filter(
+                    ingredient=self.egg):
+                row.amount = 5
+                row.save()
+            IngredientInRecipe.objects.filter(
+                recipe=self.pancakes, ingredient=self.flour).delete()
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual(
+            sorted(CookIndexChange.objects.get(pk=version + 1).recipe_ids),
+            sorted([self.omelette.pk, self.pancakes.pk]))
+        self.assertEqual(self.index.search([self.egg.pk], 0),
+                         ([self.pancakes.pk], [0]))
+
+    def test_cascade_delete_is_one_version(self):
+        version = current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.omelette.delete()
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual(self.index.search([self.egg.pk, self.milk.pk], 0),
+                         ([], []))
+
+    def test_rolled_back_savepoint_keeps_later_changes(self):
+        version = current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    IngredientInRecipe.objects.filter(
+                        recipe=self.omelette).delete()
+                    raise ValueError
+            except ValueError:
+                pass
+            IngredientInRecipe.objects.filter(
+                recipe=self.pancakes, ingredient=self.flour).delete()
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual(self.index.search([self.egg.pk], 0),
+                         ([self.pancakes.pk], [0]))
+
+    def test_missing_version_forces_rebuild(self):
+        CookIndexChange.objects.create(recipe_ids=[self.omelette.pk])
+        CookIndexChange.objects.create(recipe_ids=[])
+        CookIndexChange.objects.order_by('pk').first().delete()
+        IngredientInRecipe.objects.filter(recipe=self.omelette).delete()
+        self.assertEqual(self.index.search([self.milk.pk], 2), ([], []))
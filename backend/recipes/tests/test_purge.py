@@ -0,0 +1,20 @@
+from recipes.cook_index import CookIndex, current_version
+from recipes.models import Recipe
+from recipes.purge import purge_deleted, soft_delete_recipes
+from .base import RecipesTestCase
+
+
+class PurgeTest(RecipesTestCase):
+
+    def test_purge_batch_bumps_cook_index_once(self):
+        egg, = self.create_ingredients('яйцо')
+        for number in range(6):
+            self.create_recipe(f'Рецепт {number}', [egg])
+        index = CookIndex()
+        self.assertEqual(len(index.search([egg.pk], 0)[0]), 6)
+        soft_delete_recipes(Recipe.objects.all())
+        version = current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(purge_deleted(), 6)
+        self.assertEqual(current_version(), version + 1)
+        self.assertEqual(index.search([egg.pk], 0), ([], []))
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from api.serializers import RecipeCreateUpdateSerializer
+from jobs.models import Job
+from jobs.queue import run_due
+from recipes import similarity
+from recipes.models import Recipe, SimilarRecipe
+from recipes.purge import purge_deleted, soft_delete_recipes
+from recipes.tasks import refresh_similar
+from .base import RecipesTestCase
+
+
+class SimilarRecipesTest(RecipesTestCase):
+
+    def setUp(self):
+        flour, egg, milk, fish, rice = self.create_ingredients(
+            'мука', 'яйцо', 'молоко', 'рыба', 'рис')
+        self.pancakes = self.create_recipe('Блины', [flour, egg, milk])
+        self.omelette = self.create_recipe('Омлет', [egg, milk])
+        self.pie = self.create_recipe('Пирог', [flour, egg])
+        self.sushi = self.create_recipe('Суши', [fish, rice])
+        self.rice = rice
+        similarity.rebuild()
+
+    def neighbours(self, recipe):
+        return set(SimilarRecipe.objects.filter(
+            recipe=recipe).values_list('similar_id', flat=True))
+
+    def test_rebuild(self):
+        self.assertEqual(self.neighbours(self.pancakes),
+                         {self.omelette.pk, self.pie.pk})
+        self.assertEqual(self.neighbours(self.sushi), set())
+
+    def test_soft_delete_removes_recipe_from_other_lists(self):
+        soft_delete_recipes(Recipe.objects.filter(
+            pk=self.omelette.pk))
+        self.assertTrue(Job.objects.filter(
+            name='recipes.refresh_similar').exists())
+        run_due(10)
+        self.assertFalse(SimilarRecipe.objects.filter(
+            similar=self.omelette).exists())
+        self.assertFalse(SimilarRecipe.objects.filter(
+            recipe=self.omelette).exists())
+        self.assertEqual(self.neighbours(self.pancakes), {self.pie.pk})
+
+    def test_purge_after_soft_delete_leaves_no_rows(self):
+        soft_delete_recipes(Recipe.objects.filter(pk=self.pie.pk))
+        run_due(10)
+        purge_deleted()
+        self.assertFalse(SimilarRecipe.objects.filter(
+            similar_id=self.pie.pk).exists())
+        self.assertEqual(self.neighbours(self.omelette), {self.pancakes.pk})
+
+    def test_save_only_enqueues_refresh(self):
+        with mock.patch.object(similarity, 'build_matrix') as build:
+            RecipeCreateUpdateSerializer.contents_changed(self.omelette.pk)
+        build.assert_not_called()
+        self.assertTrue(Job.objects.filter(
+            name='recipes.refresh_similar').exists())
+
+    def test_queued_changes_share_one_matrix_build(self):
+        self.omelette.ingredients.add(self.rice, through_defaults={
+            'amount': 1})
+        with mock.patch.object(similarity, 'build_matrix',
+                               wraps=similarity.build_matrix) as build:
+            refresh_similar([{'recipe_id': self.omelette.pk},
+                             {'recipe_ids': [self.pie.pk]}])
+        build.assert_called_once()
+        self.assertIn(self.omelette.pk, self.neighbours(self.sushi))
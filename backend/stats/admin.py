@@ -0,0 +1,38 @@
+from django.contrib import admin
+
+from stats.models import (AuthorStat, DailyRecipeStat, IngredientStat,
+                          RecipeStat, TagStat)
+
+
+@admin.register(IngredientStat)
+class IngredientStatAdmin(admin.ModelAdmin):
+
+    list_display = ['ingredient', 'recipes_count']
+    list_select_related = ['ingredient']
+
+
+@admin.register(TagStat)
+class TagStatAdmin(admin.ModelAdmin):
+
+    list_display = ['tag', 'recipes_count']
+    list_select_related = ['tag']
+
+
+@admin.register(RecipeStat)
+class RecipeStatAdmin(admin.ModelAdmin):
+
+    list_display = ['recipe', 'favorites_count']
+    list_select_related = ['recipe']
+
+
+@admin.register(AuthorStat)
+class AuthorStatAdmin(admin.ModelAdmin):
+
+    list_display = ['author', 'followers_count']
+    list_select_related = ['author']
+
+
+@admin.register(DailyRecipeStat)
+class DailyRecipeStatAdmin(admin.ModelAdmin):
+
+    list_display = ['date', 'recipes_count']
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from stats.summary import refresh_all, source_database
+
+
+class Command(BaseCommand):
+    """Пересчитывает сводные таблицы для /api/stats/."""
+    help = ('Считает популярные ингредиенты, теги, рецепты, авторов и '
+            'новые рецепты по дням. С --interval повторяет пересчёт.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database',
+                            help='Откуда читать, по умолчанию реплика.')
+        parser.add_argument('--interval', type=float,
+                            help='Пауза в секундах между пересчётами.')
+
+    def handle(self, *args, **options):
+        using = options['database'] or source_database()
+        while True:
+            close_old_connections()
+            started = time.perf_counter()
+            refresh_all(using)
+            self.stdout.write('Статистика пересчитана за {:.1f} с'.format(
+                time.perf_counter() - started))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
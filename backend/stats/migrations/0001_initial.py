@@ -0,0 +1,83 @@
+# Generated by Django 3.2 on 2026-10-19 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0007_recipe_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRecipeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='День')),
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Новых рецептов')),
+            ],
+            options={
+                'verbose_name': 'Новые рецепты за день',
+                'verbose_name_plural': 'Новые рецепты по дням',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='recipes.tag', verbose_name='Тег')),
+            ],
+            options={
+                'verbose_name': 'Статистика тега',
+                'verbose_name_plural': 'Статистика тегов',
+                'ordering': ['-recipes_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecipeStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('favorites_count', models.PositiveIntegerField(verbose_name='В избранном')),
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Статистика рецепта',
+                'verbose_name_plural': 'Статистика рецептов',
+                'ordering': ['-favorites_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='IngredientStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipes_count', models.PositiveIntegerField(verbose_name='Рецептов')),
+                ('ingredient', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ингредиент')),
+            ],
+            options={
+                'verbose_name': 'Статистика ингредиента',
+                'verbose_name_plural': 'Статистика ингредиентов',
+                'ordering': ['-recipes_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuthorStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('followers_count', models.PositiveIntegerField(verbose_name='Подписчиков')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Статистика автора',
+                'verbose_name_plural': 'Статистика авторов',
+                'ordering': ['-followers_count'],
+            },
+        ),
+    ]
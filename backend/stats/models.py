@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import models
+
+from recipes.models import Ingredient, Recipe, Tag
+
+
+class IngredientStat(models.Model):
+    """Самые используемые ингредиенты"""
+    ingredient = models.OneToOneField(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов'
+    )
+
+    class Meta:
+        ordering = ['-recipes_count']
+        verbose_name = 'Статистика ингредиента'
+        verbose_name_plural = 'Статистика ингредиентов'
+
+
+class TagStat(models.Model):
+    """Число рецептов с тегом"""
+    tag = models.OneToOneField(
+        Tag,
+        on_delete=models.CASCADE,
+        verbose_name='Тег'
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов'
+    )
+
+    class Meta:
+        ordering = ['-recipes_count']
+        verbose_name = 'Статистика тега'
+        verbose_name_plural = 'Статистика тегов'
+
+
+class RecipeStat(models.Model):
+    """Рецепты, чаще всего добавляемые в избранное"""
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном'
+    )
+
+    class Meta:
+        ordering = ['-favorites_count']
+        verbose_name = 'Статистика рецепта'
+        verbose_name_plural = 'Статистика рецептов'
+
+
+class AuthorStat(models.Model):
+    """Авторы с наибольшим числом подписчиков"""
+    author = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        verbose_name='Автор'
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков'
+    )
+
+    class Meta:
+        ordering = ['-followers_count']
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class DailyRecipeStat(models.Model):
+    """Число новых рецептов за день"""
+    date = models.DateField(
+        unique=True,
+        verbose_name='День'
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Новых рецептов'
+    )
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Новые рецепты за день'
+        verbose_name_plural = 'Новые рецепты по дням'
@@ -0,0 +1,101 @@
+"""Пересчёт сводных таблиц статистики.
+
+Агрегаты по IngredientInRecipe, TagRecipe, Favorite и Subscribe
+считаются командой ``refresh_stats`` по расписанию, по возможности на
+реплике, и сохраняются в маленькие таблицы этого приложения. Запрос
+``/api/stats/`` читает только их. Новые рецепты по дням пересчитываются
+начиная с последнего сохранённого дня.
+"""
+from datetime import datetime, time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Max
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from foodgram.db_router import replica_aliases
+from recipes.models import Favorite, IngredientInRecipe, Recipe, TagRecipe
+from users.models import Subscribe
+from .models import (AuthorStat, DailyRecipeStat, IngredientStat,
+                     RecipeStat, TagStat)
+
+TOP_SIZE = 100
+REFRESHED_KEY = 'stats:refreshed_at'
+
+
+def source_database():
+    """Откуда читать агрегаты: первая реплика или основная база."""
+    aliases = replica_aliases()
+    return aliases[0] if aliases else DEFAULT_DB_ALIAS
+
+
+@transaction.atomic
+def replace(model, objects):
+    model.objects.all().delete()
+    model.objects.bulk_create(objects)
+
+
+def refresh_ingredients(using):
+    rows = IngredientInRecipe.objects.using(using).filter(
+        recipe__deleted=False).values('ingredient_id').annotate(
+        count=Count('recipe_id', distinct=True)).order_by('-count')
+    replace(IngredientStat, [
+        IngredientStat(ingredient_id=row['ingredient_id'],
+                       recipes_count=row['count'])
+        for row in rows[:TOP_SIZE]
+    ])
+
+
+def refresh_tags(using):
+    rows = TagRecipe.objects.using(using).filter(
+        recipe__deleted=False).values('tag_id').annotate(
+        count=Count('recipe_id', distinct=True)).order_by()
+    replace(TagStat, [
+        TagStat(tag_id=row['tag_id'], recipes_count=row['count'])
+        for row in rows
+    ])
+
+
+def refresh_recipes(using):
+    rows = Favorite.objects.using(using).filter(
+        recipe__deleted=False).values('recipe_id').annotate(
+        count=Count('pk')).order_by('-count')
+    replace(RecipeStat, [
+        RecipeStat(recipe_id=row['recipe_id'], favorites_count=row['count'])
+        for row in rows[:TOP_SIZE]
+    ])
+
+
+def refresh_authors(using):
+    rows = Subscribe.objects.using(using).filter(
+        author__deleted=False).values('author_id').annotate(
+        count=Count('pk')).order_by('-count')
+    replace(AuthorStat, [
+        AuthorStat(author_id=row['author_id'], followers_count=row['count'])
+        for row in rows[:TOP_SIZE]
+    ])
+
+
+@transaction.atomic
+def refresh_daily(using):
+    """Пересчитывает дни начиная с последнего сохранённого."""
+    recipes = Recipe.all_objects.using(using).filter(created__isnull=False)
+    last = DailyRecipeStat.objects.aggregate(Max('date'))['date__max']
+    if last is not None:
+        recipes = recipes.filter(created__gte=timezone.make_aware(
+            datetime.combine(last, time.min)))
+        DailyRecipeStat.objects.filter(date__gte=last).delete()
+    DailyRecipeStat.objects.bulk_create(
+        DailyRecipeStat(date=row['date'], recipes_count=row['count'])
+        for row in recipes.annotate(date=TruncDate('created')).values(
+            'date').annotate(count=Count('pk')).order_by()
+    )
+
+
+def refresh_all(using=None):
+    using = using or source_database()
+    for refresh in (refresh_ingredients, refresh_tags, refresh_recipes,
+                    refresh_authors, refresh_daily):
+        refresh(using)
+    cache.set(REFRESHED_KEY, timezone.now(), None)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from recipes.purge import soft_delete_users
 from .models import User, Subscribe
 
 
@@ -10,15 +11,33 @@ class UserAdmin(admin.ModelAdmin):
         'pk', 'username', 'email', 'first_name', 'last_name',
         'is_staff', 'date_joined']
     search_fields = ['username', 'first_name', 'last_name', 'email']
-    list_filter = ['username', 'email', 'is_staff', 'date_joined']
+    list_filter = ['is_staff', 'date_joined']
     empty_value_display = '-empty-'
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).filter(deleted=False)
+
+    def get_deleted_objects(self, objs, request):
+        # Рецепты и подписки удалит purge_deleted, перечислять их не нужно.
+        return [str(obj) for obj in objs], {}, set(), []
+
+    def delete_model(self, request, obj):
+        soft_delete_users(User.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        soft_delete_users(queryset)
 
 
 class SubscribeAdmin(admin.ModelAdmin):
     """Class to customize subscriptions display in admin panel."""
 
     list_display = ['pk', 'user', 'author']
-    search_fields = ['user', 'author']
+    list_select_related = ['user', 'author']
+    search_fields = ['user__username', 'user__email',
+                     'author__username', 'author__email']
+    autocomplete_fields = ['user', 'author']
+    show_full_result_count = False
 
 
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,22 @@
+# Generated by Django 3.2 on 2026-10-19 09:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_auto_20230427_0102'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='deleted',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Помечен на удаление'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(condition=models.Q(deleted=True), fields=['deleted'], name='user_deleted_idx'),
+        ),
+    ]
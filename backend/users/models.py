@@ -12,10 +12,21 @@ class User(AbstractUser):
         null=False
     )
 
+    deleted = models.BooleanField(
+        verbose_name='Помечен на удаление',
+        default=False,
+        editable=False
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', )
 
     class Meta:
+        indexes = [
+            models.Index(fields=['deleted'],
+                         condition=models.Q(deleted=True),
+                         name='user_deleted_idx')
+        ]
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ['-id']